@@ -0,0 +1,126 @@
+import hashlib
+import json
+from fastapi import Response
+from app import records
+from app.state import VOLATILE_FIELDS, store
+
+try:
+    import msgpack
+except ImportError:  # MessagePack is optional, JSON is always available
+    msgpack = None
+
+API_VERSION = 1
+JSON_TYPE = "application/json"
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+_cache = {}  # (revision, fields, media type) -> (etag, body)
+CACHE_SIZE = 64
+
+# Left out of the ETag: poll timestamps, and breaker counters that tick while an upstream is down
+ETAG_IGNORED = VOLATILE_FIELDS + ("updated_at", "retry_at", "failures", "last_error")
+
+
+def _ranked(accept):
+    # Accept header -> (media types by preference, types refused with q=0)
+    ranked = []
+    refused = set()
+    for position, part in enumerate(accept.split(",")):
+        media_type, *params = [p.strip() for p in part.split(";")]
+        media_type = media_type.lower()
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q <= 0:
+            refused.add(media_type)
+        else:
+            ranked.append((-q, position, media_type))
+    return [media_type for _, _, media_type in sorted(ranked)], refused
+
+
+def choose_media_type(accept, format=None):
+    # ?format= wins over Accept so clients that can't set headers can still ask for MessagePack
+    if format:
+        wanted, refused = [MSGPACK_TYPES[0] if format == "msgpack" else JSON_TYPE], set()
+    else:
+        wanted, refused = _ranked(accept)
+    supported = [JSON_TYPE] + ([MSGPACK_TYPES[0]] if msgpack is not None else [])
+    for media_type in wanted:
+        if media_type in MSGPACK_TYPES and msgpack is not None:
+            return MSGPACK_TYPES[0]
+        if media_type == JSON_TYPE:
+            return JSON_TYPE
+        if media_type in ("application/*", "*/*", ""):
+            for candidate in supported:
+                if candidate not in refused:
+                    return candidate
+    return None
+
+
+def state_document(state=store):
+    # Every source keyed by name (the threat level included), plus when it was last refreshed
+    document = {"api_version": API_VERSION}
+    for name, value in state.items():
+        document[name] = {**records.to_primitive(value), "updated_at": state.updated_at(name)}
+    return document
+
+
+def select_fields(value, paths):
+    # fields=threat.level,earthquake.quakes.mag -> only those branches; paths map over lists
+    if not paths or [] in paths:
+        return value
+    if isinstance(value, list):
+        return [select_fields(item, paths) for item in value]
+    if not isinstance(value, dict):
+        return value
+    selected = {}
+    for key in dict.fromkeys(path[0] for path in paths):
+        if key in value:
+            selected[key] = select_fields(value[key], [path[1:] for path in paths if path[0] == key])
+    return selected
+
+
+def _stable(value):
+    # Drops fields that change on every poll, at any depth (e.g. an open breaker's retry time)
+    if isinstance(value, dict):
+        return {k: _stable(v) for k, v in value.items() if k not in ETAG_IGNORED}
+    if isinstance(value, list):
+        return [_stable(v) for v in value]
+    return value
+
+
+def _etag(document, media_type):
+    # Weak: compression changes the bytes, and fields that change on every poll are left out
+    stable = _stable(document)
+    digest = hashlib.sha256(json.dumps(stable, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    return f'W/"{digest}-{media_type.split("/")[-1]}"'
+
+
+def encode(document, media_type):
+    if media_type == JSON_TYPE:
+        return json.dumps(document, separators=(",", ":")).encode()
+    return msgpack.packb(document, use_bin_type=True)
+
+
+def state_response(fields=None, media_type=JSON_TYPE, if_none_match=None, state=store):
+    # Encoded once per state revision; polls between updates only pay for a dict lookup
+    key = (state.revision, fields, media_type)
+    cached = _cache.get(key)
+    if cached is None:
+        document = state_document(state)
+        if fields:
+            document = select_fields(document, [path.split(".") for path in fields.split(",") if path])
+        cached = (_etag(document, media_type), encode(document, media_type))
+        if len(_cache) >= CACHE_SIZE:
+            _cache.clear()
+        _cache[key] = cached
+
+    etag, body = cached
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept"}
+    if if_none_match and etag.removeprefix("W/") in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type=media_type, headers=headers)
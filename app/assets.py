@@ -0,0 +1,62 @@
+import hashlib
+import mimetypes
+import os
+from fastapi import Response
+from app.compression import brotli, choose_encoding, compress
+
+STATIC_DIR = "static"
+ASSET_PREFIX = "/assets"
+
+# Files that get a content-hashed URL and precompressed variants
+HASHED_EXTENSIONS = (".js", ".css", ".svg")
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+_assets = {}  # hashed filename -> {"media_type", "etag", "identity", "gzip", "br"}
+_urls = {}    # original filename -> hashed URL
+
+
+def build_assets(directory=STATIC_DIR):
+    _assets.clear()
+    _urls.clear()
+    for name in sorted(os.listdir(directory)):
+        root, ext = os.path.splitext(name)
+        if ext not in HASHED_EXTENSIONS:
+            continue
+        with open(os.path.join(directory, name), "rb") as f:
+            data = f.read()
+
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        hashed_name = f"{root}.{digest}{ext}"
+        _assets[hashed_name] = {
+            "media_type": mimetypes.guess_type(name)[0] or "application/octet-stream",
+            "etag": f'"{digest}"',
+            "identity": data,
+            "gzip": compress(data, "gzip", static=True),
+            "br": compress(data, "br", static=True) if brotli is not None else None,
+        }
+        _urls[name] = f"{ASSET_PREFIX}/{hashed_name}"
+    return _urls
+
+
+def asset_url(name):
+    # Fall back to the plain static mount for anything not hashed (e.g. snapshots)
+    return _urls.get(name, f"/static/{name}")
+
+
+def asset_response(hashed_name, accept_encoding="", if_none_match=None):
+    asset = _assets.get(hashed_name)
+    if asset is None:
+        return Response(status_code=404)
+
+    headers = {"Cache-Control": IMMUTABLE_CACHE, "ETag": asset["etag"], "Vary": "Accept-Encoding"}
+    if if_none_match == asset["etag"]:
+        return Response(status_code=304, headers=headers)
+
+    encoding = choose_encoding(accept_encoding)
+    body = asset.get(encoding) if encoding else None
+    if body is None:
+        body = asset["identity"]
+    else:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=asset["media_type"], headers=headers)
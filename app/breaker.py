@@ -0,0 +1,95 @@
+import random
+import threading
+import time
+
+FAILURE_THRESHOLD = 3    # Consecutive failures before the circuit opens
+BASE_DELAY = 30          # Seconds the circuit stays open after the first trip
+MAX_DELAY = 15 * 60      # Cap for the exponential backoff
+JITTER = 0.2             # +/- fraction applied to each delay so sources don't retry in lockstep
+PROBE_TIMEOUT = 60       # Allow a new probe if the previous one never reported back
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpen(Exception):
+    def __init__(self, breaker):
+        self.breaker = breaker
+        super().__init__(f"{breaker.name} unavailable, retrying in {breaker.retry_in():.0f}s")
+
+
+class CircuitBreaker:
+    """Fails fast while an upstream is down, then lets a single probe through to test recovery."""
+
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, base_delay=BASE_DELAY,
+                 max_delay=MAX_DELAY, jitter=JITTER):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.retry_at = 0.0
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    def retry_in(self):
+        return max(self.retry_at - time.time(), 0.0)
+
+    def before_request(self):
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            now = time.time()
+            if (self.state == OPEN and now >= self.retry_at) or \
+                    (self.state == HALF_OPEN and now >= self.retry_at + PROBE_TIMEOUT):
+                self.state = HALF_OPEN  # This caller is the probe
+                self.retry_at = now
+                return
+            raise CircuitOpen(self)
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.trips = 0
+            self.last_error = None
+
+    def record_failure(self, error):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error) or type(error).__name__
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.trips += 1
+                delay = min(self.max_delay, self.base_delay * 2 ** (self.trips - 1))
+                delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+                self.retry_at = time.time() + delay
+                self.state = OPEN
+
+    def status(self):
+        return {
+            "name": self.name,
+            "state": self.state,
+            "failures": self.failures,
+            "retry_at": self.retry_at if self.state != CLOSED else None,
+            "last_error": self.last_error,
+        }
+
+
+_breakers = {}
+
+
+def get_breaker(name):
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(name)
+    return breaker
+
+
+def breaker_status(prefix):
+    # Status of every breaker for a source that isn't currently healthy
+    return [b.status() for name, b in sorted(_breakers.items())
+            if name.startswith(prefix + "/") and b.state != CLOSED]
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime
+from app import camera, traffic
+from app.history import history, run_history_writer
+from app.poller import start_pollers, stop_pollers
+from app.sites import SITES, state_key
+from app.snapshot import run_snapshot_writer, save_snapshot
+from app.state import store
+from app.threat import DECAY_REFRESH, engines
+
+SYNC_INTERVAL = 1        # Seconds between followers pulling state from the backend
+ELECTION_INTERVAL = 5    # Seconds between leadership checks / lease renewals
+LEASE_TTL = 15           # A leader that stops renewing for this long is replaced
+
+
+async def _decay_ticker():
+    # The score decays with time even when no source changes, so the leader re-publishes it
+    while True:
+        await asyncio.sleep(DECAY_REFRESH)
+        for engine in engines.values():
+            engine.current()
+
+
+class Coordinator:
+    """Elects one leader per deployment to run the camera, pollers and history writer.
+
+    Every worker serves requests from the state store; followers keep it in sync with
+    what the leader publishes to the shared backend.
+    """
+
+    def __init__(self, backend, state=store, node_id=None):
+        self.backend = backend
+        self.state = state
+        self.node_id = node_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.leader = False
+        self._leader_tasks = []
+        self._task = None
+
+    async def start(self):
+        self.state.backend = self.backend
+        await self._elect()
+        if not self.leader:
+            self.state.sync()
+        self._task = asyncio.create_task(self._run(), name="coordinator")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self.leader:
+            await self._demote()
+            await asyncio.to_thread(save_snapshot, self.state)
+            await asyncio.to_thread(self.backend.release_leader, self.node_id)
+
+    async def _run(self):
+        ticks = 0
+        while True:
+            await asyncio.sleep(SYNC_INTERVAL)
+            ticks += 1
+            try:
+                if ticks * SYNC_INTERVAL >= ELECTION_INTERVAL:
+                    ticks = 0
+                    await self._elect()
+                if not self.leader:
+                    self.state.sync()
+            except Exception as e:
+                logging.exception(f"Coordinator error: {e}")
+
+    async def _elect(self):
+        leader = await asyncio.to_thread(self.backend.acquire_leader, self.node_id, LEASE_TTL)
+        if leader and not self.leader:
+            await self._promote()
+        elif not leader and self.leader:
+            await self._demote()
+
+    async def _promote(self):
+        logging.info(f"{self.node_id} elected leader")
+        self.state.sync()
+
+        # Carry module-level poller state over from the previous leader
+        for slug in SITES:
+            motion = self.state.get(state_key("motion", slug)) or {}
+            if motion.get("last_motion"):
+                camera.last_motion_times[slug] = datetime.fromisoformat(motion["last_motion"])
+        if self.state.get("traffic") is not None:
+            traffic.first_load = False
+
+        self.state.publishing = True
+        self.state.publish_all()  # Values restored from a snapshot become visible to followers
+        for engine in engines.values():
+            engine.rebuild(self.state.items())
+        self.state.subscribe(history.record, all_updates=True)
+        for engine in engines.values():
+            self.state.subscribe(engine.on_change)
+
+        self._leader_tasks = start_pollers()
+        self._leader_tasks.append(asyncio.create_task(run_history_writer(), name="history-writer"))
+        self._leader_tasks.append(asyncio.create_task(_decay_ticker(), name="threat-decay"))
+        self._leader_tasks.append(asyncio.create_task(run_snapshot_writer(self.state), name="snapshot-writer"))
+        self.leader = True
+
+    async def _demote(self):
+        logging.info(f"{self.node_id} is no longer leader")
+        await stop_pollers(self._leader_tasks)
+        self._leader_tasks = []
+        self.state.unsubscribe(history.record)
+        for engine in engines.values():
+            self.state.unsubscribe(engine.on_change)
+        self.state.publishing = False
+        self.leader = False
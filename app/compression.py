@@ -0,0 +1,108 @@
+import gzip
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+# Only text-like responses are worth compressing (JPEG snapshots are already compressed)
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/msgpack", "image/svg+xml")
+MINIMUM_SIZE = 500       # Bytes; smaller bodies cost more in headers/CPU than they save
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5       # Fast enough for per-request use; static assets use 11
+
+
+def _qvalues(accept_encoding):
+    # Accept-Encoding header -> {coding: q}; q=0 means the coding is refused
+    qvalues = {}
+    for part in accept_encoding.split(","):
+        coding, *params = [p.strip() for p in part.split(";")]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qvalues[coding.lower()] = q
+    return qvalues
+
+
+def choose_encoding(accept_encoding):
+    qvalues = _qvalues(accept_encoding)
+    wildcard = qvalues.get("*", 0.0)
+    # Highest q wins; on a tie brotli is preferred since it compresses better
+    candidates = [(qvalues.get("gzip", wildcard), 0, "gzip")]
+    if brotli is not None:
+        candidates.append((qvalues.get("br", wildcard), 1, "br"))
+    q, _, coding = max(candidates)
+    return coding if q > 0 else None
+
+
+def compress(data, encoding, static=False):
+    if encoding == "br":
+        return brotli.compress(data, quality=11 if static else BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=9 if static else GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """Compress dynamic responses with brotli or gzip based on Accept-Encoding."""
+
+    def __init__(self, app, minimum_size=MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        body = []
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+
+            if message["type"] == "http.response.start":
+                response_headers = dict(message.get("headers", []))
+                content_type = response_headers.get(b"content-type", b"").decode("latin-1")
+                already_encoded = b"content-encoding" in response_headers
+                if already_encoded or not content_type.startswith(COMPRESSIBLE_TYPES):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            payload = b"".join(body)
+            response_headers = [
+                (k, v) for k, v in start_message.get("headers", []) if k.lower() != b"content-length"
+            ]
+            if len(payload) >= self.minimum_size:
+                payload = compress(payload, encoding)
+                response_headers.append((b"content-encoding", encoding.encode()))
+            response_headers.append((b"vary", b"Accept-Encoding"))
+            response_headers.append((b"content-length", str(len(payload)).encode()))
+
+            await send({**start_message, "headers": response_headers})
+            await send({"type": "http.response.body", "body": payload})
+
+        await self.app(scope, receive, send_wrapper)
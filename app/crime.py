@@ -1,60 +1,57 @@
-import httpx
+from app.records import Incident
+from app.sites import SITES
+from app.upstream import upstream_client
 from datetime import datetime
+import asyncio
 import pytz
 import re
 import json
 
 PACIFIC_TZ = pytz.timezone("America/Los_Angeles")
 
-ZIP_CODE = "98272"
-
-CRIME_URL = f"https://communitycrimemap.com/?address={ZIP_CODE}&radius=5&days=30"
-
-async def get_crime_data():
-    async with httpx.AsyncClient() as client:
-        try:
-            resp = await client.get(CRIME_URL, timeout=15.0)
-            resp.raise_for_status()
-            text = resp.text
-
-            match = re.search(r"var markers = (\[.*?\]);", text, re.DOTALL)
-            if not match:
-                return {
-                    "incidents": ["<span style='color:#00ff00;'>No recent incidents reported</span>"],
-                    "violent_crime": False,
-                    "last_update": datetime.now(PACIFIC_TZ).strftime("%H:%M:%S")
-                }
-
-            markers = json.loads(match.group(1))
-
-            incidents = []
-            violent_crime = False
-
-            for marker in markers[:10]:
-                desc = marker.get("description", "Unknown incident")
-                date_str = marker.get("date", "Unknown date")
-                crime_type = marker.get("type", "Unknown")
-
-                if any(word in crime_type.lower() for word in ["assault", "robbery", "homicide", "weapon"]):
-                    violent_crime = True
-                    style = "color:red; font-weight:bold;"
-                else:
-                    style = ""
-
-                incidents.append(f'<span style="{style}">{date_str} | {crime_type} | {desc}</span>')
-
-            if not incidents:
-                incidents = ["<span style='color:#00ff00;'>No recent incidents reported</span>"]
-
-            return {
-                "incidents": incidents,
-                "violent_crime": violent_crime,
-                "last_update": datetime.now(PACIFIC_TZ).strftime("%H:%M:%S")
-            }
-        except Exception as e:
-            print(f"Crime API error: {e}")
-            return {
-                "incidents": [f"<span style='color:orange;'>Crime data unavailable: {str(e)}</span>"],
-                "violent_crime": False,
-                "last_update": datetime.now(PACIFIC_TZ).strftime("%H:%M:%S")
-            }
+def crime_url(site):
+    # The crime map is searched by address, so each site is its own request
+    return f"https://communitycrimemap.com/?address={site.zip_code}&radius={site.crime_radius_mi:g}&days=30"
+
+def parse_crime_page(text):
+    match = re.search(r"var markers = (\[.*?\]);", text, re.DOTALL)
+    if not match:
+        return {"incidents": [], "incident_count": 0, "violent_crime": False}
+
+    markers = json.loads(match.group(1))
+
+    incidents = []
+    violent_crime = False
+
+    for marker in markers[:10]:
+        desc = marker.get("description", "Unknown incident")
+        date_str = marker.get("date", "Unknown date")
+        crime_type = marker.get("type", "Unknown")
+
+        violent = any(word in crime_type.lower() for word in ["assault", "robbery", "homicide", "weapon"])
+        violent_crime = violent_crime or violent
+
+        incidents.append(Incident(when=date_str, category=crime_type, description=desc, severe=violent))
+
+    return {
+        "incidents": incidents,
+        "incident_count": len(markers),
+        "violent_crime": violent_crime
+    }
+
+async def _site_crime(client, site):
+    try:
+        resp = await client.get(crime_url(site), timeout=15.0)
+        resp.raise_for_status()
+
+        data = parse_crime_page(resp.text)
+        data["last_update"] = datetime.now(PACIFIC_TZ).strftime("%H:%M:%S")
+        return data
+    except Exception as e:
+        print(f"Crime API error ({site.name}): {e}")
+        return {"error": str(e)}
+
+async def get_crime_data(sites=SITES):
+    async with upstream_client() as client:
+        results = await asyncio.gather(*(_site_crime(client, site) for site in sites.values()))
+    return dict(zip(sites, results))
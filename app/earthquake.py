@@ -1,83 +1,144 @@
-import httpx
+from app.records import Alert, Quake
+from app.sites import SITES, SiteIndex, covering_circle
+from app.upstream import gather_feeds, upstream_client
 from datetime import datetime, timedelta
+from functools import partial
+import asyncio
 import pytz
-import math
 
 PACIFIC_TZ = pytz.timezone("America/Los_Angeles")
 
-# Home location (Monroe, WA)
-HOME_LAT = 47.8554
-HOME_LON = -121.971
-
-# Distance calculation (Haversine formula)
-def haversine(lat1, lon1, lat2, lon2):
-    R = 6371  # Earth radius in km
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
-    a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    distance_km = R * c
-    return distance_km * 0.621371  # Convert to miles
-
-async def get_earthquake_data():
-    async with httpx.AsyncClient() as client:
-        try:
-            # USGS API for quakes in Puget Sound region (last 24 hours, min mag 1.0 for sensitivity)
-            starttime = (datetime.utcnow() - timedelta(days=1)).isoformat() + "Z"
-            usgs_url = (
-                f"https://earthquake.usgs.gov/fdsnws/event/1/query?"
-                f"format=geojson&starttime={starttime}&minmagnitude=1.0"
-                f"&latitude={HOME_LAT}&longitude={HOME_LON}&maxradiuskm=400"  # ~250 miles for Puget Sound/Cascadia
-            )
-            usgs_resp = await client.get(usgs_url, timeout=10.0)
-            usgs_resp.raise_for_status()
-            usgs_data = usgs_resp.json()
-
-            quakes = []
-            major_quake = False
-            for feature in usgs_data["features"][:10]:  # Last 10
-                props = feature["properties"]
-                geom = feature["geometry"]["coordinates"]  # lon, lat, depth
-                mag = props["mag"] or 0
-                place = props["place"]
-                time = datetime.fromtimestamp(props["time"]/1000, tz=pytz.utc).astimezone(PACIFIC_TZ)
-                depth_km = geom[2]
-                distance = haversine(HOME_LAT, HOME_LON, geom[1], geom[0])
-                felt = props.get("felt", 0) or 0
-                detail_url = props["detail"]
-
-                # Get aftershock info if available
-                aftershock_info = ""
-                detail_resp = await client.get(detail_url, timeout=5.0)
-                if detail_resp.status_code == 200:
-                    detail_json = detail_resp.json()
-                    products = detail_json["properties"]["products"]
-                    if "aftershock-forecast" in products:
-                        aftershock_info = "Aftershock forecast available"
-
-                style = "color:red; font-weight:bold;" if mag > 3.5 and distance <= 100 else ""
-                quakes.append(f'<span style="{style}">'
-                              f'{time.strftime("%H:%M")} | Mag {mag:.1f} | {place} | '
-                              f'Depth {depth_km:.1f}km | {distance:.0f}mi away | '
-                              f'Felt by {felt} people | {aftershock_info}'
-                              f'</span>')
-
-            # Tsunami warnings from NWS (already used in weather, but duplicate for reliability)
-            alerts_resp = await client.get("https://api.weather.gov/alerts/active?area=WA", timeout=10.0)
-            alerts_resp.raise_for_status()
-            alerts = alerts_resp.json()["features"]
-            tsunami_status = "No active tsunami alerts"
-            for alert in alerts:
-                if "tsunami" in alert["properties"]["event"].lower():
-                    tsunami_status = f"TSUNAMI WARNING: {alert["properties"]["headline"]}"
-                    major_quake = True  # Treat tsunami as severe
-
-            return {
-                "quakes": quakes,
-                "major_quake": major_quake,
-                "tsunami": tsunami_status,
-                "last_update": datetime.now(PACIFIC_TZ).strftime("%H:%M:%S")
-            }
-        except Exception as e:
-            print(f"Earthquake API error: {e}")
-            return {"error": str(e)}
+MAX_QUAKES = 10  # Per site
+
+def usgs_query_url(starttime, lat, lon, radius_km):
+    # USGS API for quakes around the sites (min mag 1.0 for sensitivity)
+    return (
+        f"https://earthquake.usgs.gov/fdsnws/event/1/query?"
+        f"format=geojson&starttime={starttime}&minmagnitude=1.0"
+        f"&latitude={lat:.4f}&longitude={lon:.4f}&maxradiuskm={radius_km}"
+    )
+
+
+def quake_radius(site):
+    return site.quake_radius_mi
+
+
+def sites_query_url(starttime, sites=SITES):
+    # One query whose circle covers every site's radius
+    lat, lon, miles = covering_circle(sites.values(), quake_radius)
+    return usgs_query_url(starttime, lat, lon, round(miles / 0.621371))
+
+
+def parse_quake(feature, aftershock_forecast=False, distance=0.0):
+    props = feature["properties"]
+    geom = feature["geometry"]["coordinates"]  # lon, lat, depth
+    return Quake(
+        time=props["time"] / 1000,
+        mag=props["mag"] or 0,
+        place=props["place"],
+        depth_km=geom[2],
+        distance=distance,  # Miles from the site it's shown for
+        felt=props.get("felt", 0) or 0,
+        aftershock_forecast=aftershock_forecast,
+        lat=geom[1],
+        lon=geom[0],
+    )
+
+
+def quakes_by_site(features, sites=SITES):
+    # -> {site slug: [(feature, distance in miles)]}, newest first as USGS returns them
+    index = SiteIndex(sites.values(), quake_radius)
+    views = {slug: [] for slug in sites}
+    for feature in features:
+        lon, lat = feature["geometry"]["coordinates"][:2]
+        for site, distance in index.near(lat, lon):
+            if len(views[site.slug]) < MAX_QUAKES:
+                views[site.slug].append((feature, distance))
+    return views
+
+
+async def _has_aftershock_forecast(client, detail_url):
+    # Optional: a failure here keeps the quake, just without aftershock info
+    try:
+        detail_resp = await client.get(detail_url, timeout=5.0)
+        if detail_resp.status_code == 200:
+            products = detail_resp.json()["properties"]["products"]
+            return "aftershock-forecast" in products
+    except Exception as e:
+        print(f"Earthquake detail error: {e}")
+    return False
+
+
+async def _quakes(client, sites):
+    # Last 24 hours, for all sites at once
+    starttime = (datetime.utcnow() - timedelta(days=1)).isoformat() + "Z"
+    usgs_resp = await client.get(sites_query_url(starttime, sites), timeout=10.0)
+    usgs_resp.raise_for_status()
+    views = quakes_by_site(usgs_resp.json()["features"], sites)
+
+    # Detail lookups once per quake, even if it's near several sites
+    details = {}
+    for matches in views.values():
+        for feature, _ in matches:
+            detail_url = feature["properties"]["detail"]
+            if detail_url not in details:
+                details[detail_url] = await _has_aftershock_forecast(client, detail_url)
+
+    return {
+        slug: {"quakes": [
+            parse_quake(feature, details[feature["properties"]["detail"]], distance)
+            for feature, distance in matches
+        ]}
+        for slug, matches in views.items()
+    }
+
+
+def parse_tsunami(alerts):
+    tsunami_alerts = []
+    for alert in alerts:
+        props = alert["properties"]
+        if "tsunami" in props["event"].lower():
+            tsunami_alerts.append(Alert(event=props["event"], headline=props["headline"],
+                                        severity=props.get("severity", ""), area=props.get("areaDesc", "")))
+    # Treat tsunami as severe
+    return {"tsunami": tsunami_alerts, "major_quake": bool(tsunami_alerts)}
+
+
+async def _tsunami(client):
+    # Tsunami warnings from NWS (already used in weather, but duplicate for reliability)
+    alerts_resp = await client.get("https://api.weather.gov/alerts/active?area=WA", timeout=10.0)
+    alerts_resp.raise_for_status()
+    return parse_tsunami(alerts_resp.json()["features"])
+
+
+async def _site_quakes(client, quakes, slug):
+    return (await quakes)[slug]
+
+
+async def _shared(client, result):
+    return await result
+
+
+def site_feeds(site, quakes, tsunami):
+    # Sub-feed name -> (fetcher, values to show if it fails); both feeds are shared between sites
+    return {
+        "USGS": (partial(_site_quakes, quakes=quakes, slug=site.slug), {"quakes": None}),
+        "Tsunami": (partial(_shared, result=tsunami), {"tsunami": None, "major_quake": None}),
+    }
+
+
+async def get_earthquake_data(sites=SITES):
+    async with upstream_client() as client:
+        quakes = asyncio.ensure_future(_quakes(client, sites))
+        tsunami = asyncio.ensure_future(_tsunami(client))
+        results = await asyncio.gather(*(
+            gather_feeds(client, site_feeds(site, quakes, tsunami), f"Earthquake {site.name}")
+            for site in sites.values()
+        ))
+
+    last_update = datetime.now(PACIFIC_TZ).strftime("%H:%M:%S")
+    views = dict(zip(sites, results))
+    for data in views.values():
+        if "error" not in data:
+            data["last_update"] = last_update
+    return views
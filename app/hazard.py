@@ -1,4 +1,5 @@
-import httpx
+from app.records import Outage
+from app.upstream import failed_feeds, gather_feeds, upstream_client
 from datetime import datetime
 import pytz
 import re
@@ -9,65 +10,67 @@ PUD_URL = "https://outage.snopud.com/"
 PSE_URL = "https://www.pse.com/outage/outage-map"
 XFINITY_URL = "https://downdetector.com/status/comcast-xfinity/"
 
-async def get_hazard_data():
-    async with httpx.AsyncClient() as client:
-        try:
-            # PUD Electric
-            pud_outages = "Status unavailable"
-            major_pud = False
-            try:
-                pud_resp = await client.get(PUD_URL, timeout=15.0)
-                if pud_resp.status_code == 200:
-                    pud_text = pud_resp.text.lower()
-                    if "current outages" in pud_text:
-                        match = re.search(r"current outages.*?(\d+)", pud_text)
-                        pud_outages = match.group(1) if match else "Unknown"
-                    elif "no outages" in pud_text:
-                        pud_outages = "0"
-                    major_pud = int(pud_outages) > 50 if pud_outages.isdigit() else False
-            except Exception as e:
-                print(f"PUD error: {e}")
+def parse_pud(text):
+    text = text.lower()
+    pud_outages = "Status unavailable"
+    if "current outages" in text:
+        match = re.search(r"current outages.*?(\d+)", text)
+        pud_outages = match.group(1) if match else "Unknown"
+    elif "no outages" in text:
+        pud_outages = "0"
+    customers = int(pud_outages) if pud_outages.isdigit() else None
+    return Outage("PUD Electric", pud_outages, customers, major=customers is not None and customers > 50)
+
+def parse_pse(text):
+    text = text.lower()
+    if "natural gas" in text or "gas" in text:
+        if "no outages" in text:
+            return Outage("PSE Natural Gas", "No gas outages")
+        return Outage("PSE Natural Gas", "Gas issues reported", major=True)
+    return Outage("PSE Natural Gas", "No gas alerts")
+
+def parse_xfinity(text):
+    if "no problems" in text.lower():
+        return Outage("Xfinity Internet", "No widespread issues")
+    return Outage("Xfinity Internet", "Possible issues reported", major=True)
 
-            # PSE Natural Gas
-            pse_status = "No gas alerts"
-            major_pse = False
-            try:
-                pse_resp = await client.get(PSE_URL, timeout=15.0)
-                if pse_resp.status_code == 200:
-                    pse_text = pse_resp.text.lower()
-                    if "natural gas" in pse_text or "gas" in pse_text:
-                        if "no outages" in pse_text:
-                            pse_status = "No gas outages"
-                        else:
-                            pse_status = "Gas issues reported"
-                            major_pse = True
-            except Exception as e:
-                print(f"PSE error: {e}")
+async def _pud(client):
+    pud_resp = await client.get(PUD_URL, timeout=15.0)
+    pud_resp.raise_for_status()
+    return {"pud": parse_pud(pud_resp.text)}
 
-            # Xfinity Internet
-            xfinity_status = "No widespread issues"
-            major_xfinity = False
-            try:
-                xfinity_resp = await client.get(XFINITY_URL, timeout=15.0)
-                if xfinity_resp.status_code == 200:
-                    xfinity_text = xfinity_resp.text.lower()
-                    if "no problems" in xfinity_text:
-                        xfinity_status = "No widespread issues"
-                    else:
-                        xfinity_status = "Possible issues reported"
-                        major_xfinity = True
-            except Exception as e:
-                print(f"Xfinity error: {e}")
+async def _pse(client):
+    pse_resp = await client.get(PSE_URL, timeout=15.0)
+    pse_resp.raise_for_status()
+    return {"pse": parse_pse(pse_resp.text)}
 
-            major_outage = major_pud or major_pse or major_xfinity
+async def _xfinity(client):
+    xfinity_resp = await client.get(XFINITY_URL, timeout=15.0)
+    xfinity_resp.raise_for_status()
+    return {"xfinity": parse_xfinity(xfinity_resp.text)}
+
+# Sub-feed name -> (fetcher, what to show if it fails). A failed utility is unknown, not all-clear.
+FEEDS = {
+    "PUD": (_pud, {"pud": Outage("PUD Electric", "Status unavailable")}),
+    "PSE": (_pse, {"pse": Outage("PSE Natural Gas", "Status unavailable")}),
+    "Xfinity": (_xfinity, {"xfinity": Outage("Xfinity Internet", "Status unavailable")}),
+}
+
+async def get_hazard_data():
+    async with upstream_client() as client:
+        data = await gather_feeds(client, FEEDS, "Hazard")
+    if "error" in data:
+        return data
 
-            return {
-                "power": f"PUD Electric: {pud_outages} customers affected",
-                "gas": f"PSE Natural Gas: {pse_status}",
-                "internet": f"Xfinity Internet: {xfinity_status}",
-                "major_outage": major_outage,
-                "last_update": datetime.now(PACIFIC_TZ).strftime("%H:%M:%S")
-            }
-        except Exception as e:
-            print(f"Hazard alert error: {e}")
-            return {"error": str(e)}
+    failed = failed_feeds(data)
+    power, gas, internet = data.pop("pud"), data.pop("pse"), data.pop("xfinity")
+    outages = [power, gas, internet]
+    major = any(outage.major for outage in outages)
+    data.update({
+        "outages": outages,
+        "power_outages": power.customers if "PUD" not in failed else None,
+        # None while a utility couldn't be checked and the others look fine
+        "major_outage": True if major else (None if failed else False),
+        "last_update": datetime.now(PACIFIC_TZ).strftime("%H:%M:%S")
+    })
+    return data
@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from app.sites import parse_key
+
+HISTORY_DB = os.getenv("HISTORY_DB", "data/history.db")  # Local to the leader's host, not shared via STATE_BACKEND
+
+FLUSH_INTERVAL = 15      # Seconds between batched writes
+PRUNE_INTERVAL = 3600
+
+# Rollup table -> bucket width in seconds
+ROLLUPS = {"rollup_1m": 60, "rollup_1h": 3600}
+
+# Table -> how long rows are kept, in seconds
+RETENTION = {
+    "samples": 2 * 86400,
+    "rollup_1m": 14 * 86400,
+    "rollup_1h": 400 * 86400,
+}
+
+# Queries spanning more than this use hourly rollups instead of per-minute ones
+MINUTE_ROLLUP_MAX_SPAN = 2 * 86400
+
+MOTION_WINDOW = 30       # Seconds; motion this recent counts as detected in a sample (the motion poll interval)
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (int, float)):
+        return float(value)
+    return None
+
+
+def _threat(data):
+    return {"score": data.get("score")}
+
+
+def _motion(data):
+    if not data.get("last_motion"):
+        return {"detected": False}
+    age = (datetime.now(timezone.utc) - datetime.fromisoformat(data["last_motion"])).total_seconds()
+    return {"detected": age <= MOTION_WINDOW}
+
+
+def _traffic(data):
+    # One count per site route, e.g. highway2_incidents
+    metrics = {f"{route['key']}_incidents": len(route["incidents"]) for route in data.get("routes", [])}
+    metrics["major_incident"] = data.get("major_incident")
+    return metrics
+
+
+def _weather(data):
+    return {
+        "temperature": data.get("current_temp"),
+        "precip": data.get("precip"),
+        "alerts": len(data["alerts"]) if data.get("alerts") is not None else None,
+    }
+
+
+def _earthquake(data):
+    quakes = data.get("quakes")
+    if quakes is None:  # USGS feed failed this poll
+        return {"quakes": None, "max_magnitude": None}
+    return {
+        "quakes": len(quakes),
+        "max_magnitude": max((q.mag for q in quakes), default=0.0),
+    }
+
+
+def _crime(data):
+    return {"incidents": data.get("incident_count"), "violent_crime": data.get("violent_crime")}
+
+
+def _hazard(data):
+    return {"power_outages": data.get("power_outages"), "major_outage": data.get("major_outage")}
+
+
+def _geopolitical(data):
+    return {"major_event": data.get("major_event")}
+
+
+# Source name -> function returning {metric: value}; non-numeric values are skipped.
+# Readings are stored under the state key, so each site has its own series.
+EXTRACTORS = {
+    "threat": _threat,
+    "motion": _motion,
+    "traffic": _traffic,
+    "weather": _weather,
+    "earthquake": _earthquake,
+    "crime": _crime,
+    "hazard": _hazard,
+    "geopolitical": _geopolitical,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    source TEXT NOT NULL, metric TEXT NOT NULL, ts REAL NOT NULL, value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS samples_series ON samples (source, metric, ts);
+""" + "".join(f"""
+CREATE TABLE IF NOT EXISTS {table} (
+    source TEXT NOT NULL, metric TEXT NOT NULL, bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL, sum REAL NOT NULL, min REAL NOT NULL, max REAL NOT NULL,
+    PRIMARY KEY (source, metric, bucket)
+) WITHOUT ROWID;
+""" for table in ROLLUPS)
+
+
+class HistoryStore:
+    """Batched SQLite (WAL) time series of source readings with 1-minute and 1-hour rollups."""
+
+    def __init__(self, path=HISTORY_DB):
+        self.path = path
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def open(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        if self._conn is not None:
+            self.flush()
+            self._conn.close()
+            self._conn = None
+
+    def record(self, name, value, previous=None):
+        extractor = EXTRACTORS.get(parse_key(name)[0])
+        if extractor is None or not isinstance(value, dict) or "error" in value:
+            return
+        ts = time.time()
+        readings = [(name, metric, ts, _number(v)) for metric, v in extractor(value).items()]
+        with self._pending_lock:
+            self._pending.extend(r for r in readings if r[3] is not None)
+
+    def flush(self):
+        if self._conn is None:
+            return 0
+        with self._pending_lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return 0
+
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT INTO samples VALUES (?, ?, ?, ?)", batch)
+            for table, width in ROLLUPS.items():
+                buckets = {}
+                for source, metric, ts, value in batch:
+                    key = (source, metric, int(ts // width) * width)
+                    count, total, low, high = buckets.get(key, (0, 0.0, value, value))
+                    buckets[key] = (count + 1, total + value, min(low, value), max(high, value))
+                self._conn.executemany(
+                    f"""INSERT INTO {table} VALUES (?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT (source, metric, bucket) DO UPDATE SET
+                            count = count + excluded.count,
+                            sum = sum + excluded.sum,
+                            min = min(min, excluded.min),
+                            max = max(max, excluded.max)""",
+                    [key + stats for key, stats in buckets.items()],
+                )
+        return len(batch)
+
+    def prune(self, now=None):
+        now = now or time.time()
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM samples WHERE ts < ?", (now - RETENTION["samples"],))
+            for table in ROLLUPS:
+                self._conn.execute(f"DELETE FROM {table} WHERE bucket < ?", (now - RETENTION[table],))
+
+    def series(self, source, metric, hours=24, points=120):
+        # Returns [[bucket_start, avg, min, max], ...] downsampled to at most `points` rows
+        end = time.time()
+        start = end - hours * 3600
+        table = "rollup_1m" if hours * 3600 <= MINUTE_ROLLUP_MAX_SPAN else "rollup_1h"
+        width = ROLLUPS[table]
+        step = max(width, -(-int(hours * 3600 / points) // width) * width)
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"""SELECT (bucket / ?) * ?, SUM(sum) / SUM(count), MIN(min), MAX(max)
+                    FROM {table}
+                    WHERE source = ? AND metric = ? AND bucket >= ?
+                    GROUP BY bucket / ?
+                    ORDER BY 1""",
+                (step, step, source, metric, int(start), step),
+            ).fetchall()
+        # The first bucket is aligned down to `step`, so the window can span one bucket more than asked
+        return [[ts, round(avg, 3), low, high] for ts, avg, low, high in rows[-points:]]
+
+    def metrics(self, source):
+        # Metrics the extractor always reports, plus any per-route ones recorded for this key
+        extractor = EXTRACTORS.get(parse_key(source)[0])
+        if extractor is None:
+            return []
+        names = list(extractor({}))
+        if self._conn is not None:
+            with self._lock:
+                rows = self._conn.execute("SELECT DISTINCT metric FROM rollup_1h WHERE source = ?", (source,)).fetchall()
+            names.extend(metric for (metric,) in rows if metric not in names)
+        return names
+
+
+history = HistoryStore()
+
+
+async def run_history_writer(store=history):
+    last_prune = 0.0
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL)
+        try:
+            await asyncio.to_thread(store.flush)
+            if time.time() - last_prune >= PRUNE_INTERVAL:
+                await asyncio.to_thread(store.prune)
+                last_prune = time.time()
+        except Exception as e:
+            logging.exception(f"History writer error: {e}")
@@ -1,361 +1,193 @@
-from fastapi import FastAPI, Request, Depends
-from fastapi.responses import HTMLResponse
+from app import startup
+from fastapi import FastAPI, Request, Depends, HTTPException
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from datetime import datetime, timedelta
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from contextlib import asynccontextmanager
+from datetime import datetime
 import pytz
+import math
 import os
-from app.camera import detect_motion
-from app.traffic import get_traffic_data
-from app.weather import get_weather_data
-from app.earthquake import get_earthquake_data
-from app.crime import get_crime_data
-from app.hazard import get_hazard_data
-from app.geopolitical import get_geopolitical_data
+import time
+from app.cluster import Coordinator
+from app.poller import latest
+from app.shared import create_backend
+from app.state import store
+from app.threat import engines
+from app.history import history
 from app.security import verify_credentials  # <-- NEW: authentication
+from app.assets import build_assets, asset_url, asset_response
+from app.api import choose_media_type, state_response
+from app.compression import CompressionMiddleware
+from app.metrics import MetricsMiddleware, render_metrics
+from app.upstream import close_client, failed_feeds
+from app.snapshot import restore_snapshot
+from app.sites import SITES, Site, get_site, state_key
+from app.camera import snapshot_path
 import logging
 
+startup.mark("imports")
+
 logging.basicConfig(level=logging.INFO)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    # Hash and precompress static assets once so every request serves from memory
+    with startup.phase("assets"):
+        build_assets()
+    with startup.phase("history"):
+        history.open()
+    # Serve the last known state immediately; the leader's pollers refresh it in the background
+    with startup.phase("snapshot"):
+        restore_snapshot()
+    # One worker is elected to run the camera and pollers; the rest serve its shared state
+    with startup.phase("election"):
+        coordinator = Coordinator(create_backend())
+        await coordinator.start()
+    startup.report()
+    yield
+    await coordinator.stop()
+    await close_client()
+    history.close()
+
+app = FastAPI(lifespan=lifespan)
+
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-templates = Jinja2Templates(directory="templates")
+# Built here because newer Starlette no longer passes Jinja options through Jinja2Templates
+templates = Jinja2Templates(env=Environment(
+    loader=FileSystemLoader("templates"), autoescape=select_autoescape(), trim_blocks=True, lstrip_blocks=True,
+))
+templates.env.globals["asset_url"] = asset_url
+templates.env.globals["sites"] = SITES
 
 PACIFIC_TZ = pytz.timezone("America/Los_Angeles")
 
+templates.env.filters["clock"] = lambda ts: datetime.fromtimestamp(ts, PACIFIC_TZ).strftime("%H:%M")
+
+def upstream_notes(data):
+    # Shown on a card when sub-feeds failed or upstream circuits are open
+    notes = []
+    for breaker in data.get("upstreams", []):
+        upstream = breaker["name"].split("/", 1)[-1]
+        if breaker["state"] == "open":
+            retry = max(int(breaker["retry_at"] - time.time()), 0)
+            notes.append(f"{upstream}: circuit open, retry in {retry}s")
+        else:
+            notes.append(f"{upstream}: recovering")
+    for feed in sorted(failed_feeds(data)):
+        notes.append(f"{feed} unavailable")
+    return notes
+
+def render_fragment(name, **context):
+    # Cards are rendered from templates/fragments; autoescaping keeps upstream text inert
+    data = context.get("data", {})
+    html = templates.get_template(f"fragments/{name}.html").render(notes=upstream_notes(data), **context)
+    return HTMLResponse(html)
+
+def snapshot_timestamp(site):
+    path = snapshot_path(site.slug)
+    return int(os.path.getmtime(path)) if os.path.exists(path) else None
+
+def resolve_site(site: str = ""):
+    # ?site= picks the profile; the dashboard passes it on to every card through hx-vals
+    profile = get_site(site)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Unknown site: {site}")
+    return profile
+
 @app.get("/", response_class=HTMLResponse)
-async def dashboard(request: Request, user: str = Depends(verify_credentials)):
+async def dashboard(request: Request, user: str = Depends(verify_credentials), site: Site = Depends(resolve_site)):
     now = datetime.now(PACIFIC_TZ).strftime("%Y-%m-%d %H:%M:%S %Z")
     return templates.TemplateResponse(
+        request,
         "dashboard.html",
-        {"request": request, "title": "Threat Assessment Dashboard", "now": now}
+        {"title": "Threat Assessment Dashboard", "now": now, "site": site}
     )
 
+@app.get("/assets/{name}")
+async def assets(name: str, request: Request):
+    return asset_response(
+        name,
+        request.headers.get("accept-encoding", ""),
+        request.headers.get("if-none-match"),
+    )
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics(user: str = Depends(verify_credentials)):
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/v1/state")
+async def api_state(request: Request, fields: str = "", format: str = "", user: str = Depends(verify_credentials)):
+    # Read-only state of every source for other systems; poll with If-None-Match to get 304s
+    media_type = choose_media_type(request.headers.get("accept", ""), format)
+    if media_type is None:
+        return JSONResponse({"error": "Supported formats: application/json, application/msgpack"}, status_code=406)
+    return state_response(fields, media_type, request.headers.get("if-none-match"))
+
+@app.get("/history/{source}")
+async def history_series(source: str, hours: float = 24, points: int = 120, user: str = Depends(verify_credentials),
+                         site: Site = Depends(resolve_site)):
+    # Sparkline data for a card: {metric: [[bucket_start, avg, min, max], ...]}
+    key = state_key(source, site.slug)
+    metrics = history.metrics(key)
+    if not metrics:
+        return JSONResponse({"error": f"Unknown source: {source}"}, status_code=404)
+    if not math.isfinite(hours):
+        return JSONResponse({"error": "hours must be a finite number"}, status_code=422)
+    hours = min(max(hours, 0.25), 90 * 24)
+    points = min(max(points, 10), 1000)
+    return {
+        "source": source,
+        "hours": hours,
+        "series": {metric: history.series(key, metric, hours, points) for metric in metrics},
+    }
+
 @app.get("/motion-status", response_class=HTMLResponse)
-async def motion_status(user: str = Depends(verify_credentials)):
+async def motion_status(user: str = Depends(verify_credentials), site: Site = Depends(resolve_site)):
     logging.info("=== Motion status requested ===")
-    last_motion = detect_motion()
+    data = await latest("motion", site.slug)
     now = datetime.now(PACIFIC_TZ)
-
-    if isinstance(last_motion, str):
-        status = last_motion
-        color = "orange"
-        image_html = ""
-    elif last_motion is None:
-        status = "No recent motion detected"
-        color = "#00ff00"
-        image_html = ""
-    else:
-        delta = now - last_motion
-        if delta < timedelta(minutes=5):
-            status = f"MOTION DETECTED {int(delta.total_seconds())} seconds ago!"
-            color = "red"
-            ts = int(now.timestamp())
-            image_html = f'''
-            <div id="snapshot-container" hx-get="/snapshot" hx-trigger="every 5s" hx-swap="outerHTML">
-                <img src="/static/last_motion.jpg?t={ts}" style="max-width:100%; border-radius:8px; margin-top:10px;">
-            </div>
-            '''
-        else:
-            status = f"Last motion: {int(delta.total_seconds() // 60)} minutes ago"
-            color = "#ffff00"
-            if os.path.exists("static/last_motion.jpg"):
-                ts = int(os.path.getmtime("static/last_motion.jpg"))
-                image_html = f'<img src="/static/last_motion.jpg?t={ts}" style="max-width:100%; border-radius:8px; margin-top:10px;">'
-            else:
-                image_html = ""
-
-    return f"""
-    <div class="card" hx-get="/motion-status" hx-trigger="load, every 30s" hx-swap="outerHTML">
-        <h2>Front Door Camera (Motion Detection)</h2>
-        <div class="card-content">
-            <p id="motion-status" style="color:{color}; font-weight:bold;">{status}</p>
-            <p>Last check: <span id="motion-time">{now.strftime("%H:%M:%S")}</span></p>
-        </div>
-        {image_html}
-    </div>
-    """
+    last_motion = datetime.fromisoformat(data["last_motion"]) if data.get("last_motion") else None
+    motion_age = (now - last_motion).total_seconds() if last_motion else None
+    return render_fragment("motion", url="/motion-status", every=30, data=data, now=now, site=site,
+                           motion_age=motion_age, snapshot_ts=snapshot_timestamp(site),
+                           snapshot_url=f"/{snapshot_path(site.slug)}")
 
 @app.get("/snapshot", response_class=HTMLResponse)
-async def snapshot(user: str = Depends(verify_credentials)):
-    snapshot_path = "static/last_motion.jpg"
-    if os.path.exists(snapshot_path):
-        ts = int(os.path.getmtime(snapshot_path))
-        return f'''
-        <div id="snapshot-container" hx-get="/snapshot" hx-trigger="every 5s" hx-swap="outerHTML">
-            <img src="/static/last_motion.jpg?t={ts}" style="max-width:100%; border-radius:8px; margin-top:10px;">
-        </div>
-        '''
-    else:
-        return '<div id="snapshot-container"></div>'
+async def snapshot(user: str = Depends(verify_credentials), site: Site = Depends(resolve_site)):
+    return render_fragment("snapshot", snapshot_ts=snapshot_timestamp(site), snapshot_url=f"/{snapshot_path(site.slug)}")
 
 @app.get("/traffic-status", response_class=HTMLResponse)
-async def traffic_status(user: str = Depends(verify_credentials)):
-    data = await get_traffic_data()
-
-    if "error" in data:
-        content = f"<div class='card-content'><p style='color:orange;'>Traffic API error: {data['error']}</p></div>"
-        dot_color = "orange"
-    else:
-        def format_incidents(incidents):
-            if not incidents:
-                return "<span style='color:#00ff00;'>No incidents reported</span>"
-            lines = []
-            for inc in incidents:
-                cat = inc.get("EventCategory", "Alert")
-                desc = inc.get("HeadlineDescription", "Unknown incident")
-                start = inc.get("StartTime", "")
-                lines.append(f"<strong>{cat} ({start}):</strong> {desc}")
-            return "<br>".join(lines[:10])
-
-        highway2_text = format_incidents(data["highway2_incidents"])
-        highway522_text = format_incidents(data["highway522_incidents"])
-
-        content = f"""
-        <div class="card-content">
-            <div class="vertical-marquee">
-                <div class="vertical-marquee-content">
-                    <p><strong>{data["highway2"]}:</strong><br>{highway2_text}</p>
-                    <p><strong>{data["highway522"]}:</strong><br>{highway522_text}</p>
-                    <p style="font-size:0.8em; color:#aaa;">Last update: {data.get("last_update", "-")}</p>
-                </div>
-                <div class="vertical-marquee-content duplicate">
-                    <p><strong>{data["highway2"]}:</strong><br>{highway2_text}</p>
-                    <p><strong>{data["highway522"]}:</strong><br>{highway522_text}</p>
-                    <p style="font-size:0.8em; color:#aaa;">Last update: {data.get("last_update", "-")}</p>
-                </div>
-            </div>
-        </div>
-        """
-
-        dot_color = data.get("congestion_color", "#00ff00")
-
-    return f"""
-    <div class="card" hx-get="/traffic-status" hx-trigger="load, every 120s" hx-swap="outerHTML">
-        <h2>Traffic Incidents <span style="font-size:1.5em; color:{dot_color}">●</span></h2>
-        {content}
-    </div>
-    """
+async def traffic_status(user: str = Depends(verify_credentials), site: Site = Depends(resolve_site)):
+    return render_fragment("traffic", url="/traffic-status", every=120, site=site, data=await latest("traffic", site.slug))
 
 @app.get("/weather-status", response_class=HTMLResponse)
-async def weather_status(user: str = Depends(verify_credentials)):
-    data = await get_weather_data()
-
-    if "error" in data:
-        content = f"<div class='card-content'><p style='color:orange;'>Weather API error: {data['error']}</p></div>"
-    else:
-        alerts_text = "<br>".join(data["alerts"]) if data["alerts"] else "<span style='color:#00ff00;'>No active alerts</span>"
-        content = f"""
-        <div class="card-content">
-            <div class="vertical-marquee">
-                <div class="vertical-marquee-content">
-                    <p><strong>Monroe:</strong> {data["current_temp"]}°F, {data["conditions"]}<br>
-                    Wind: {data["wind"]}, Precip last hour: {data["precip"]:.2f}\"</p>
-                    <p><strong>Stevens Pass:</strong><br>Conditions: {data["stevens_conditions"]}<br>
-                    Restrictions: {data["stevens_restrictions"]}</p>
-                    <p><strong>Alerts:</strong><br>{alerts_text}</p>
-                    <p style="font-size:0.8em; color:#aaa;">Last update: {data["last_update"]}</p>
-                </div>
-                <div class="vertical-marquee-content duplicate">
-                    <p><strong>Monroe:</strong> {data["current_temp"]}°F, {data["conditions"]}<br>
-                    Wind: {data["wind"]}, Precip last hour: {data["precip"]:.2f}\"</p>
-                    <p><strong>Stevens Pass:</strong><br>Conditions: {data["stevens_conditions"]}<br>
-                    Restrictions: {data["stevens_restrictions"]}</p>
-                    <p><strong>Alerts:</strong><br>{alerts_text}</p>
-                    <p style="font-size:0.8em; color:#aaa;">Last update: {data["last_update"]}</p>
-                </div>
-            </div>
-        </div>
-        """
-
-    return f"""
-    <div class="card" hx-get="/weather-status" hx-trigger="load, every 300s" hx-swap="outerHTML">
-        <h2>Weather</h2>
-        {content}
-    </div>
-    """
+async def weather_status(user: str = Depends(verify_credentials), site: Site = Depends(resolve_site)):
+    return render_fragment("weather", url="/weather-status", every=300, site=site, data=await latest("weather", site.slug))
 
 @app.get("/earthquake-status", response_class=HTMLResponse)
-async def earthquake_status(user: str = Depends(verify_credentials)):
-    data = await get_earthquake_data()
-
-    if "error" in data:
-        content = f"<div class='card-content'><p style='color:orange;'>Earthquake API error: {data['error']}</p></div>"
-    else:
-        quakes_text = "<br>".join(data["quakes"]) if data["quakes"] else "<span style='color:#00ff00;'>No recent quakes</span>"
-        content = f"""
-        <div class="card-content">
-            <div class="vertical-marquee">
-                <div class="vertical-marquee-content">
-                    <p><strong>Recent quakes (Puget Sound region):</strong><br>{quakes_text}</p>
-                    <p><strong>Tsunami status:</strong> {data["tsunami"]}</p>
-                    <p style="font-size:0.8em; color:#aaa;">Last update: {data["last_update"]}</p>
-                </div>
-                <div class="vertical-marquee-content duplicate">
-                    <p><strong>Recent quakes (Puget Sound region):</strong><br>{quakes_text}</p>
-                    <p><strong>Tsunami status:</strong> {data["tsunami"]}</p>
-                    <p style="font-size:0.8em; color:#aaa;">Last update: {data["last_update"]}</p>
-                </div>
-            </div>
-        </div>
-        """
-
-    return f"""
-    <div class="card" hx-get="/earthquake-status" hx-trigger="load, every 300s" hx-swap="outerHTML">
-        <h2>Earthquakes & Tsunami</h2>
-        {content}
-    </div>
-    """
+async def earthquake_status(user: str = Depends(verify_credentials), site: Site = Depends(resolve_site)):
+    return render_fragment("earthquake", url="/earthquake-status", every=300, site=site,
+                           data=await latest("earthquake", site.slug))
 
 @app.get("/crime-status", response_class=HTMLResponse)
-async def crime_status(user: str = Depends(verify_credentials)):
-    data = await get_crime_data()
-
-    if "error" in data:
-        content = f"<div class='card-content'><p style='color:orange;'>Crime data error: {data['error']}</p></div>"
-    else:
-        incidents_text = "<br>".join(data["incidents"]) if data["incidents"] else "<span style='color:#00ff00;'>No recent incidents</span>"
-        content = f"""
-        <div class="card-content">
-            <div class="vertical-marquee">
-                <div class="vertical-marquee-content">
-                    <p><strong>Recent incidents (within 5 miles):</strong><br>{incidents_text}</p>
-                    <p style="font-size:0.8em; color:#aaa;">Last update: {data["last_update"]}</p>
-                </div>
-                <div class="vertical-marquee-content duplicate">
-                    <p><strong>Recent incidents (within 5 miles):</strong><br>{incidents_text}</p>
-                    <p style="font-size:0.8em; color:#aaa;">Last update: {data["last_update"]}</p>
-                </div>
-            </div>
-        </div>
-        """
-
-    return f"""
-    <div class="card" hx-get="/crime-status" hx-trigger="load, every 600s" hx-swap="outerHTML">
-        <h2>Local Crime (within 5 miles)</h2>
-        {content}
-    </div>
-    """
+async def crime_status(user: str = Depends(verify_credentials), site: Site = Depends(resolve_site)):
+    return render_fragment("crime", url="/crime-status", every=600, site=site, data=await latest("crime", site.slug))
 
 @app.get("/hazard-status", response_class=HTMLResponse)
 async def hazard_status(user: str = Depends(verify_credentials)):
-    data = await get_hazard_data()
-
-    if "error" in data:
-        content = f"<div class='card-content'><p style='color:orange;'>Hazard data error: {data['error']}</p></div>"
-    else:
-        content = f"""
-        <div class="card-content">
-            <div class="vertical-marquee">
-                <div class="vertical-marquee-content">
-                    <p>{data["power"]}</p>
-                    <p>{data["gas"]}</p>
-                    <p>{data["internet"]}</p>
-                    <p style="font-size:0.8em; color:#aaa;">Last update: {data["last_update"]}</p>
-                </div>
-                <div class="vertical-marquee-content duplicate">
-                    <p>{data["power"]}</p>
-                    <p>{data["gas"]}</p>
-                    <p>{data["internet"]}</p>
-                    <p style="font-size:0.8em; color:#aaa;">Last update: {data["last_update"]}</p>
-                </div>
-            </div>
-        </div>
-        """
-
-    return f"""
-    <div class="card" hx-get="/hazard-status" hx-trigger="load, every 600s" hx-swap="outerHTML">
-        <h2>Hazard Alerts (Puget Sound Region)</h2>
-        {content}
-    </div>
-    """
+    return render_fragment("hazard", url="/hazard-status", every=600, data=await latest("hazard"))
 
 @app.get("/geopolitical-status", response_class=HTMLResponse)
 async def geopolitical_status(user: str = Depends(verify_credentials)):
-    data = await get_geopolitical_data()
-
-    if "error" in data:
-        content = f"<div class='card-content'><p style='color:orange;'>Geopolitical data error: {data['error']}</p></div>"
-    else:
-        events_text = "<br>".join(data["events"])
-        content = f"""
-        <div class="card-content">
-            <div class="vertical-marquee">
-                <div class="vertical-marquee-content">
-                    <p><strong>Relevant events:</strong><br>{events_text}</p>
-                    <p style="font-size:0.8em; color:#aaa;">Last update: {data["last_update"]}</p>
-                </div>
-                <div class="vertical-marquee-content duplicate">
-                    <p><strong>Relevant events:</strong><br>{events_text}</p>
-                    <p style="font-size:0.8em; color:#aaa;">Last update: {data["last_update"]}</p>
-                </div>
-            </div>
-        </div>
-        """
-
-    return f"""
-    <div class="card" hx-get="/geopolitical-status" hx-trigger="load, every 900s" hx-swap="outerHTML">
-        <h2>Geopolitical (US Northwest)</h2>
-        {content}
-    </div>
-    """
+    return render_fragment("geopolitical", url="/geopolitical-status", every=900, data=await latest("geopolitical"))
 
 @app.get("/threat-level", response_class=HTMLResponse)
-async def threat_level_fragment(user: str = Depends(verify_credentials)):
-    active_reasons = []
-
-    last_motion = detect_motion()
-    if last_motion and (datetime.now(PACIFIC_TZ) - last_motion) < timedelta(minutes=5):
-        active_reasons.append("Front door motion")
-
-    traffic_data = await get_traffic_data()
-    if "major_incident" in traffic_data and traffic_data["major_incident"]:
-        active_reasons.append("Major traffic incident")
-
-    weather_data = await get_weather_data()
-    if "alerts" in weather_data and weather_data["alerts"]:
-        active_reasons.append("Weather alerts")
-
-    eq_data = await get_earthquake_data()
-    if "major_quake" in eq_data and eq_data["major_quake"]:
-        active_reasons.append("Major earthquake or tsunami")
-
-    crime_data = await get_crime_data()
-    if "violent_crime" in crime_data and crime_data["violent_crime"]:
-        active_reasons.append("Local violent crime")
-
-    hazard_data = await get_hazard_data()
-    if "major_outage" in hazard_data and hazard_data["major_outage"]:
-        active_reasons.append("Major utility outage")
-
-    geo_data = await get_geopolitical_data()
-    if "major_event" in geo_data and geo_data["major_event"]:
-        active_reasons.append("Geopolitical threat")
-
-    if len(active_reasons) >= 4:
-        level = "SEVERE"
-        color = "red"
-    elif len(active_reasons) >= 3:
-        level = "HIGH"
-        color = "orange"
-    elif len(active_reasons) >= 1:
-        level = "ELEVATED"
-        color = "yellow"
-    else:
-        level = "LOW"
-        color = "#00ff00"
-        active_reasons = ["All clear"]
-
-    reasons_text = " | ".join(active_reasons)
-
-    return f"""
-    <div style="text-align:center; padding:1rem; background:#1a1a2e; border-bottom:3px solid #00ffea;">
-        <h1 class="threat-level" style="color:{color}; text-shadow: 0 0 30px {color}; font-size:3rem; margin:0;">
-            THREAT LEVEL: <span id="level-text">{level}</span>
-        </h1>
-        <p>Last updated: {datetime.now(PACIFIC_TZ).strftime("%Y-%m-%d %H:%M:%S %Z")}</p>
-        <p id="threat-reasons" style="color:{color};">{reasons_text}</p>
-    </div>
-    """
+async def threat_level_fragment(user: str = Depends(verify_credentials), site: Site = Depends(resolve_site)):
+    threat = store.get(state_key("threat", site.slug)) or engines[site.slug].current()
+    return render_fragment("threat", threat=threat, site=site, now=datetime.now(PACIFIC_TZ))
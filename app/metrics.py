@@ -0,0 +1,145 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from cache reads up to full upstream timeouts
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, value, *label_values):
+        with self._lock:
+            self._values[label_values] = value
+
+    def render(self):
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [per-bucket counts..., +Inf count], sum
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, *label_values):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = _labels(self.labels, label_values, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, label_values)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labels, label_values)} {cumulative}")
+        return lines
+
+
+def render_metrics():
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Time every HTTP request, labelled by the endpoint function that handled it."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            endpoint = getattr(scope.get("endpoint"), "__name__", None)
+            if endpoint is None:
+                endpoint = "static" if scope["path"].startswith("/static/") else "unmatched"
+            ENDPOINT_LATENCY.observe(time.perf_counter() - start, endpoint)
+            ENDPOINT_REQUESTS.inc(endpoint, str(status))
+
+
+ENDPOINT_LATENCY = Histogram("dashboard_request_seconds", "Time spent serving HTTP requests", ("endpoint",))
+ENDPOINT_REQUESTS = Counter("dashboard_requests_total", "HTTP requests served", ("endpoint", "status"))
+
+UPSTREAM_LATENCY = Histogram("upstream_fetch_seconds", "Time to refresh a data source from its upstreams", ("source",))
+UPSTREAM_REQUESTS = Counter("upstream_requests_total", "Upstream HTTP requests", ("source", "status"))
+UPSTREAM_BYTES = Counter("upstream_response_bytes_total", "Bytes received from upstreams", ("source",))
+UPSTREAM_ERRORS = Counter("upstream_errors_total", "Failed source refreshes", ("source",))
+
+CACHE_REQUESTS = Counter("state_cache_requests_total", "Card reads served from the state store", ("source", "result"))
+
+MOTION_LATENCY = Histogram("motion_pipeline_seconds", "Motion detection time by phase", ("phase",))
+AUTH_LATENCY = Histogram("auth_check_seconds", "Time spent verifying Basic credentials", ("result",))
+
+STARTUP_PHASES = Gauge("startup_phase_seconds", "Time spent in each phase of the last startup", ("phase",))
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+from app.breaker import breaker_status
+from app.camera import get_motion_data
+from app.traffic import get_traffic_data
+from app.weather import get_weather_data
+from app.earthquake import get_earthquake_data
+from app.crime import get_crime_data
+from app.hazard import get_hazard_data
+from app.geopolitical import get_geopolitical_data
+from app.metrics import CACHE_REQUESTS, UPSTREAM_ERRORS, UPSTREAM_LATENCY
+from app.sites import DEFAULT_SITE, SHARED_SOURCES, state_key
+from app.state import store
+from app.upstream import current_source
+
+# Source name -> (fetcher, refresh interval in seconds). Intervals match the card hx-triggers.
+# Fetchers return {site slug: data}, except for the SHARED_SOURCES which cover every site.
+SOURCES = {
+    "motion": (get_motion_data, 30),
+    "traffic": (get_traffic_data, 120),
+    "weather": (get_weather_data, 300),
+    "earthquake": (get_earthquake_data, 300),
+    "crime": (get_crime_data, 600),
+    "hazard": (get_hazard_data, 600),
+    "geopolitical": (get_geopolitical_data, 900),
+}
+
+FOLLOWER_WAIT = 5  # Seconds a non-leader worker waits for the leader's first reading
+
+_inflight = {}
+
+
+async def _fetch(name):
+    fetcher, _ = SOURCES[name]
+    current_source.set(name)
+    try:
+        with UPSTREAM_LATENCY.time(name):
+            result = await fetcher()
+        views = {None: result} if name in SHARED_SOURCES else result
+        upstreams = breaker_status(name)
+        for site, data in views.items():
+            key = state_key(name, site)
+            if "error" in data:
+                UPSTREAM_ERRORS.inc(name)
+            data["upstreams"] = upstreams + (breaker_status(key) if key != name else [])
+            store.set(key, data)
+        return views
+    except Exception:
+        UPSTREAM_ERRORS.inc(name)
+        raise
+    finally:
+        _inflight.pop(name, None)
+
+
+async def refresh(name):
+    # Concurrent callers share one upstream fetch per source
+    task = _inflight.get(name)
+    if task is None:
+        task = asyncio.create_task(_fetch(name))
+        _inflight[name] = task
+    return await asyncio.shield(task)
+
+
+async def latest(name, site=DEFAULT_SITE):
+    key = state_key(name, site)
+    data = store.get(key)
+    if data is None:
+        CACHE_REQUESTS.inc(name, "miss")
+        if store.publishing:
+            # One fetch refreshes every site
+            await refresh(name)
+            return store.get(key)
+        # Only the leader talks to upstreams; other workers wait for it to publish
+        data = await store.wait_for(key, FOLLOWER_WAIT)
+        return data if data is not None else {"error": "Waiting for first update"}
+    CACHE_REQUESTS.inc(name, "hit")
+    return data
+
+
+async def _poll(name, interval):
+    while True:
+        try:
+            await refresh(name)
+        except Exception as e:
+            logging.exception(f"Poller error for {name}: {e}")
+        await asyncio.sleep(interval)
+
+
+def start_pollers():
+    return [asyncio.create_task(_poll(name, interval), name=f"poll-{name}") for name, (_, interval) in SOURCES.items()]
+
+
+async def stop_pollers(tasks):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,86 @@
+import json
+from dataclasses import dataclass, fields
+
+
+@dataclass(slots=True, frozen=True)
+class Incident:
+    """A traffic alert or a reported crime."""
+    when: str
+    category: str
+    description: str
+    priority: str = ""
+    severe: bool = False
+
+
+@dataclass(slots=True, frozen=True)
+class Quake:
+    time: float          # Seconds since epoch
+    mag: float
+    place: str
+    depth_km: float
+    distance: float      # Miles from the site
+    felt: int = 0
+    aftershock_forecast: bool = False
+    lat: float = 0.0
+    lon: float = 0.0
+
+
+@dataclass(slots=True, frozen=True)
+class Alert:
+    """An NWS alert (weather, tsunami)."""
+    event: str
+    headline: str
+    severity: str
+    area: str = ""
+
+
+@dataclass(slots=True, frozen=True)
+class Outage:
+    utility: str
+    status: str
+    customers: int | None = None
+    major: bool = False
+
+
+@dataclass(slots=True, frozen=True)
+class Event:
+    """A geopolitical or civil emergency bulletin."""
+    source: str
+    title: str
+
+
+RECORDS = (Incident, Quake, Alert, Outage, Event)
+RECORD_TYPES = {cls.__name__: cls for cls in RECORDS}
+
+# Records are tagged with their type so they survive the shared backend and snapshots
+TYPE_KEY = "_type"
+
+
+def to_primitive(value):
+    # Records (also nested in dicts/lists) -> plain dicts, e.g. for API responses
+    if isinstance(value, RECORDS):
+        return {f.name: getattr(value, f.name) for f in fields(value)}
+    if isinstance(value, dict):
+        return {k: to_primitive(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_primitive(v) for v in value]
+    return value
+
+
+def _default(value):
+    if isinstance(value, RECORDS):
+        return {TYPE_KEY: type(value).__name__, **{f.name: getattr(value, f.name) for f in fields(value)}}
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _object_hook(obj):
+    record_type = obj.pop(TYPE_KEY, None)
+    return RECORD_TYPES[record_type](**obj) if record_type else obj
+
+
+def dumps(value):
+    return json.dumps(value, default=_default, separators=(",", ":"))
+
+
+def loads(blob):
+    return json.loads(blob, object_hook=_object_hook)
@@ -0,0 +1,176 @@
+import asyncio
+import base64
+import gzip
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+import httpx
+
+# "live" (default), "record" (live + append every response to the archive) or "replay" (archive only)
+UPSTREAM_MODE = os.getenv("UPSTREAM_MODE", "live")
+UPSTREAM_ARCHIVE = os.getenv("UPSTREAM_ARCHIVE", "data/upstream-archive.jsonl.gz")
+
+# Replay latency: "recorded" reuses each response's original timing, otherwise a fixed delay in ms
+REPLAY_LATENCY = os.getenv("REPLAY_LATENCY", "recorded")
+REPLAY_JITTER_MS = float(os.getenv("REPLAY_JITTER_MS", "0"))
+
+# Query parameters that change between runs (e.g. the USGS window start) and are ignored when matching
+VOLATILE_PARAMS = ("starttime", "endtime")
+
+# Headers that no longer describe the body once httpx has decoded it
+DROPPED_HEADERS = ("content-encoding", "content-length", "transfer-encoding", "connection")
+
+
+def request_key(method, url):
+    url = httpx.URL(url)
+    params = sorted((k, v) for k, v in url.params.multi_items() if k not in VOLATILE_PARAMS)
+    query = "&".join(f"{k}={v}" for k, v in params)
+    return f"{method} {url.scheme}://{url.host}{url.path}" + (f"?{query}" if query else "")
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Passes requests through to the network and appends each response to a gzip JSONL archive."""
+
+    def __init__(self, path=UPSTREAM_ARCHIVE, transport=None):
+        self.path = path
+        self.transport = transport or httpx.AsyncHTTPTransport()
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    async def handle_async_request(self, request):
+        start = time.perf_counter()
+        response = await self.transport.handle_async_request(request)
+        body = await response.aread()
+        await response.aclose()
+        elapsed = time.perf_counter() - start
+
+        headers = [(k, v) for k, v in response.headers.multi_items() if k.lower() not in DROPPED_HEADERS]
+        record = {
+            "key": request_key(request.method, request.url),
+            "url": str(request.url),
+            "recorded_at": time.time(),
+            "elapsed": elapsed,
+            "status": response.status_code,
+            "headers": headers,
+            "body": base64.b64encode(body).decode(),
+        }
+        await asyncio.to_thread(self._append, record)
+        return httpx.Response(response.status_code, headers=headers, content=body, request=request)
+
+    def _append(self, record):
+        # Each append is its own gzip member; gzip readers concatenate them transparently
+        with self._lock, gzip.open(self.path, "at", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+def load_archive(path=UPSTREAM_ARCHIVE):
+    responses = defaultdict(list)
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                responses[record["key"]].append(record)
+    return responses
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Serves responses from an archive, cycling through every recording of a request in order.
+
+    Requests that were never recorded fail like an unreachable host.
+    """
+
+    def __init__(self, path=UPSTREAM_ARCHIVE, latency=REPLAY_LATENCY, jitter_ms=REPLAY_JITTER_MS, responses=None):
+        self.responses = responses if responses is not None else load_archive(path)
+        self.latency = latency
+        self.jitter_ms = jitter_ms
+        self._cursor = defaultdict(int)
+
+    def _delay(self, record):
+        if self.latency == "recorded":
+            delay = record.get("elapsed", 0.0)
+        else:
+            delay = float(self.latency) / 1000
+        if self.jitter_ms:
+            delay += random.uniform(-self.jitter_ms, self.jitter_ms) / 1000
+        return max(delay, 0.0)
+
+    async def handle_async_request(self, request):
+        key = request_key(request.method, request.url)
+        recordings = self.responses.get(key)
+        if not recordings:
+            raise httpx.ConnectError(f"No recorded response for {key}", request=request)
+
+        record = recordings[self._cursor[key] % len(recordings)]
+        self._cursor[key] += 1
+        await asyncio.sleep(self._delay(record))
+        return httpx.Response(
+            record["status"],
+            headers=record["headers"],
+            content=base64.b64decode(record["body"]),
+            request=request,
+        )
+
+
+def create_transport(mode=UPSTREAM_MODE):
+    if mode == "record":
+        logging.info(f"Recording upstream responses to {UPSTREAM_ARCHIVE}")
+        return RecordingTransport()
+    if mode == "replay":
+        logging.info(f"Replaying upstream responses from {UPSTREAM_ARCHIVE}")
+        return ReplayTransport()
+    return None
+
+
+class FileFrameSource:
+    """Stand-in for the RTSP camera that reads frames from a directory of images or a video file.
+
+    Loops forever, so the motion pipeline can run offline against a recorded scene.
+    """
+
+    IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+    def __init__(self, path):
+        import cv2
+        self.cv2 = cv2
+        self.path = path
+        self.capture = None
+        self.index = 0
+        if os.path.isdir(path):
+            self.frames = sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.lower().endswith(self.IMAGE_EXTENSIONS)
+            )
+        else:
+            self.frames = None
+            self.capture = cv2.VideoCapture(path)
+
+    def isOpened(self):
+        return bool(self.frames) if self.frames is not None else self.capture.isOpened()
+
+    def read(self):
+        if self.frames is not None:
+            frame = self.cv2.imread(self.frames[self.index % len(self.frames)])
+            self.index += 1
+            return frame is not None, frame
+        ret, frame = self.capture.read()
+        if not ret:
+            # End of the clip: rewind and keep going
+            self.capture.set(self.cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.capture.read()
+        return ret, frame
+
+    def release(self):
+        # detect_motion releases its source after every check; keep our place in the clip instead
+        pass
+
+    def close(self):
+        if self.capture is not None:
+            self.capture.release()
@@ -1,6 +1,10 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from passlib.context import CryptContext
+from app.metrics import AUTH_LATENCY
+import hmac
+import os
+import time
 
 security = HTTPBasic()
 
@@ -8,19 +12,36 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 USERNAME = "admin"
 
-HASHED_PASSWORD = "$2b$12$RFtV1Db2RguejEnkiq9weOyGDZaO.NdsErYAZQH95V29YAIkRBXve"
+# bcrypt hash of the dashboard password; override to run with a different one (e.g. the load test)
+HASHED_PASSWORD = os.getenv("DASHBOARD_PASSWORD_HASH", "$2b$12$RFtV1Db2RguejEnkiq9weOyGDZaO.NdsErYAZQH95V29YAIkRBXve")
+
+# bcrypt costs ~0.2s per check and every poll re-sends Basic credentials, so a successful
+# check is remembered for a while (keyed by a per-process HMAC, never the password itself)
+VERIFIED_TTL = 300
+_verified = {}
+_secret = os.urandom(32)
 
 def verify_credentials(credentials: HTTPBasicCredentials = Depends(security)):
+    start = time.perf_counter()
     if credentials.username != USERNAME:
+        AUTH_LATENCY.observe(time.perf_counter() - start, "rejected")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Basic"},
         )
+    key = hmac.new(_secret, credentials.password.encode(), "sha256").digest()
+    if _verified.get(key, 0) > time.monotonic():
+        AUTH_LATENCY.observe(time.perf_counter() - start, "cached")
+        return credentials.username
     if not pwd_context.verify(credentials.password, HASHED_PASSWORD):
+        AUTH_LATENCY.observe(time.perf_counter() - start, "rejected")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Basic"},
         )
+    _verified.clear()  # Only the current password is ever worth keeping
+    _verified[key] = time.monotonic() + VERIFIED_TTL
+    AUTH_LATENCY.observe(time.perf_counter() - start, "accepted")
     return credentials.username
@@ -0,0 +1,136 @@
+import fcntl
+import os
+import tempfile
+import threading
+import time
+
+# "file:///path" (default, one host), "memory" (single process / tests) or "redis://host:port/db"
+STATE_BACKEND = os.getenv("STATE_BACKEND", "")
+
+DEFAULT_SHARED_DIR = "/dev/shm/threat-dashboard" if os.path.isdir("/dev/shm") else \
+    os.path.join(tempfile.gettempdir(), "threat-dashboard")
+
+
+class MemoryBackend:
+    """In-process backend. Share one instance between several coordinators to stand in for multiple nodes."""
+
+    def __init__(self):
+        self._data = {}
+        self._leases = {}
+        self._lock = threading.Lock()
+
+    def write(self, key, value):
+        with self._lock:
+            self._data[key] = value
+
+    def read_all(self, prefix=""):
+        with self._lock:
+            return {k: v for k, v in self._data.items() if k.startswith(prefix)}
+
+    def acquire_leader(self, owner, ttl):
+        now = time.time()
+        with self._lock:
+            holder, expires = self._leases.get("leader", (None, 0.0))
+            if holder in (None, owner) or expires <= now:
+                self._leases["leader"] = (owner, now + ttl)
+                return True
+            return False
+
+    def release_leader(self, owner):
+        with self._lock:
+            if self._leases.get("leader", (None,))[0] == owner:
+                del self._leases["leader"]
+
+
+class FileBackend:
+    """Workers on one host share state through files on tmpfs; the leader holds an flock on a lock file."""
+
+    def __init__(self, directory=DEFAULT_SHARED_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock_fd = None
+
+    def _path(self, key):
+        return os.path.join(self.directory, key.replace("/", "__"))
+
+    def write(self, key, value):
+        # Write-then-rename so readers never see a partial file
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(value)
+        os.replace(tmp, path)
+
+    def read_all(self, prefix=""):
+        encoded = prefix.replace("/", "__")
+        values = {}
+        for name in os.listdir(self.directory):
+            if not name.startswith(encoded) or name.endswith(".tmp"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), "rb") as f:
+                    values[name.replace("__", "/")] = f.read()
+            except FileNotFoundError:
+                continue
+        return values
+
+    def acquire_leader(self, owner, ttl):
+        # The OS drops the lock if the leader process dies, so no TTL is needed here
+        if self._lock_fd is not None:
+            return True
+        fd = os.open(os.path.join(self.directory, "leader.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, owner.encode())
+        self._lock_fd = fd
+        return True
+
+    def release_leader(self, owner):
+        if self._lock_fd is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+
+class RedisBackend:
+    """Shared state for several hosts. Leadership is a Redis key with a TTL that the leader keeps renewing."""
+
+    RENEW = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) else return 0 end"
+    RELEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+
+    def __init__(self, url, namespace="threat-dashboard"):
+        import redis  # Optional dependency, only needed for multi-host deployments
+        self.redis = redis.Redis.from_url(url)
+        self.data_key = f"{namespace}:data"
+        self.leader_key = f"{namespace}:leader"
+        self._renew = self.redis.register_script(self.RENEW)
+        self._release = self.redis.register_script(self.RELEASE)
+
+    def write(self, key, value):
+        self.redis.hset(self.data_key, key, value)
+
+    def read_all(self, prefix=""):
+        return {k.decode(): v for k, v in self.redis.hgetall(self.data_key).items() if k.decode().startswith(prefix)}
+
+    def acquire_leader(self, owner, ttl):
+        ttl_ms = int(ttl * 1000)
+        if self.redis.set(self.leader_key, owner, nx=True, px=ttl_ms):
+            return True
+        return bool(self._renew(keys=[self.leader_key], args=[owner, ttl_ms]))
+
+    def release_leader(self, owner):
+        self._release(keys=[self.leader_key], args=[owner])
+
+
+def create_backend(url=STATE_BACKEND):
+    if url == "memory":
+        return MemoryBackend()
+    if url.startswith("redis://") or url.startswith("rediss://"):
+        return RedisBackend(url)
+    if url.startswith("file://"):
+        return FileBackend(url[len("file://"):])
+    return FileBackend()
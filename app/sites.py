@@ -0,0 +1,168 @@
+import json
+import math
+import os
+from collections import defaultdict
+from dataclasses import dataclass
+
+# JSON list of site profiles to monitor (see README); the first one is the default dashboard
+SITES_FILE = os.getenv("SITES_FILE", "")
+
+# Sources that cover the whole region and are shown identically on every site's dashboard
+SHARED_SOURCES = ("hazard", "geopolitical")
+
+CELL_DEGREES = 0.5  # Grid cell size for the spatial index (~35 x 55 km around 47°N)
+
+
+@dataclass(slots=True, frozen=True)
+class Route:
+    key: str
+    label: str
+    keywords: tuple
+
+
+@dataclass(slots=True, frozen=True)
+class Site:
+    slug: str
+    name: str
+    lat: float
+    lon: float
+    zip_code: str
+    observation_station: str
+    nws_areas: tuple                 # Substrings of an NWS alert's areaDesc that cover this site
+    routes: tuple
+    region: str = ""                 # Shown on cards, e.g. "Puget Sound"
+    traffic_radius_mi: float = 0     # Also include unrouted WSDOT alerts this close; 0 = routes only
+    quake_radius_mi: float = 248.5   # ~400 km, Puget Sound/Cascadia
+    crime_radius_mi: float = 5
+    camera: str | None = None
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    R = 6371  # Earth radius in km
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon/2)**2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+    distance_km = R * c
+    return distance_km * 0.621371  # Convert to miles
+
+
+# The default site's camera: a stream URL (credentials included, so it stays out of the code),
+# or a directory of frames / video file to run offline (see app.replay.FileFrameSource).
+# CAMERA_RTSP is the stream setting from .env.
+CAMERA_SOURCE = os.getenv("CAMERA_SOURCE") or os.getenv("CAMERA_RTSP") or None
+
+
+MONROE = Site(
+    slug="monroe",
+    name="Monroe",
+    lat=47.8554,
+    lon=-121.971,
+    zip_code="98272",
+    observation_station="KPAE",  # Closest station Paine Field
+    nws_areas=("Snohomish", "King", "Puget Sound"),
+    routes=(
+        Route("highway2", "Highway 2 (Everett → Wenatchee)", ("sr 2", "us 2", "highway 2", "sr2", "us2", "sr-2", "us-2")),
+        Route("highway522", "Highway 522 (Monroe → Seattle)", ("sr 522", "highway 522", "sr522", "sr-522")),
+    ),
+    region="Puget Sound",
+    camera=CAMERA_SOURCE,
+)
+
+
+def load_sites(path=SITES_FILE):
+    if not path:
+        return {MONROE.slug: MONROE}
+    with open(path) as f:
+        profiles = json.load(f)
+    sites = {}
+    for profile in profiles:
+        profile["nws_areas"] = tuple(profile.get("nws_areas", ()))
+        profile["routes"] = tuple(
+            Route(route["key"], route["label"], tuple(k.lower() for k in route["keywords"]))
+            for route in profile.get("routes", ())
+        )
+        site = Site(**profile)
+        sites[site.slug] = site
+    return sites
+
+
+SITES = load_sites()
+DEFAULT_SITE = next(iter(SITES))
+
+
+def get_site(slug=None):
+    return SITES.get(slug or DEFAULT_SITE)
+
+
+def state_key(source, site=None):
+    # The default site keeps the plain source names, so existing history and snapshots carry over
+    site = site or DEFAULT_SITE
+    if source in SHARED_SOURCES or site == DEFAULT_SITE:
+        return source
+    return f"{source}@{site}"
+
+
+def parse_key(key):
+    # -> (source, site slug); shared sources belong to no site
+    source, _, site = key.partition("@")
+    if source in SHARED_SOURCES:
+        return source, None
+    return source, site or DEFAULT_SITE
+
+
+class SiteIndex:
+    """Grid of lat/lon cells -> sites within a radius, so each feed item is only
+    distance-checked against the few sites near it rather than all of them."""
+
+    def __init__(self, sites, radius, cell=CELL_DEGREES):
+        self.cell = cell
+        self.radius = radius
+        self._cells = defaultdict(list)
+        for site in sites:
+            miles = radius(site)
+            if miles <= 0:
+                continue
+            dlat = miles / 69.0
+            dlon = miles / (69.0 * max(math.cos(math.radians(site.lat)), 0.01))
+            for i in range(self._index(site.lat - dlat), self._index(site.lat + dlat) + 1):
+                for j in range(self._index(site.lon - dlon), self._index(site.lon + dlon) + 1):
+                    self._cells[i, j].append(site)
+
+    def _index(self, degrees):
+        return math.floor(degrees / self.cell)
+
+    def near(self, lat, lon):
+        # -> [(site, distance in miles)] for every site whose radius covers the point
+        matches = []
+        for site in self._cells.get((self._index(lat), self._index(lon)), ()):
+            distance = haversine(site.lat, site.lon, lat, lon)
+            if distance <= self.radius(site):
+                matches.append((site, distance))
+        return matches
+
+
+class AreaIndex:
+    """NWS area name -> sites, for fanning statewide alerts out by their areaDesc."""
+
+    def __init__(self, sites):
+        self._areas = defaultdict(list)
+        for site in sites:
+            for area in site.nws_areas:
+                self._areas[area].append(site)
+
+    def sites_for(self, area_desc):
+        matched = {}
+        for area, sites in self._areas.items():
+            if area in area_desc:
+                for site in sites:
+                    matched[site.slug] = site
+        return list(matched.values())
+
+
+def covering_circle(sites, radius):
+    # Centre and radius (miles) of one query that covers every site's own radius
+    sites = list(sites)
+    lat = sum(site.lat for site in sites) / len(sites)
+    lon = sum(site.lon for site in sites) / len(sites)
+    return lat, lon, max(haversine(lat, lon, site.lat, site.lon) + radius(site) for site in sites)
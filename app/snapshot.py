@@ -0,0 +1,46 @@
+import asyncio
+import logging
+import os
+from app import records
+from app.state import store
+
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "data/snapshot.json")
+SNAPSHOT_INTERVAL = 60   # Seconds between periodic snapshots (one is also taken at shutdown)
+SNAPSHOT_VERSION = 3     # Bumped when source values change shape; older snapshots are ignored
+
+
+def save_snapshot(state=store, path=SNAPSHOT_PATH):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(records.dumps({"version": SNAPSHOT_VERSION, "sources": state.snapshot()}))
+    os.replace(tmp, path)
+
+
+def restore_snapshot(state=store, path=SNAPSHOT_PATH):
+    # Last known readings from the previous run, so the first page render doesn't wait on upstreams
+    try:
+        with open(path) as f:
+            saved = records.loads(f.read())
+    except FileNotFoundError:
+        return 0
+    except (OSError, ValueError, TypeError, KeyError) as e:
+        logging.warning(f"Ignoring unreadable snapshot {path}: {e}")
+        return 0
+    if saved.get("version") != SNAPSHOT_VERSION:
+        logging.warning(f"Ignoring snapshot {path} from an older version")
+        return 0
+    saved = saved["sources"]
+    for name, record in saved.items():
+        state.restore(name, record["value"], record["updated"])
+    return len(saved)
+
+
+async def run_snapshot_writer(state=store):
+    while True:
+        await asyncio.sleep(SNAPSHOT_INTERVAL)
+        try:
+            await asyncio.to_thread(save_snapshot, state)
+        except Exception as e:
+            logging.exception(f"Snapshot error: {e}")
@@ -0,0 +1,38 @@
+import logging
+import time
+from contextlib import contextmanager
+from app.metrics import STARTUP_PHASES
+
+# Imported first by app.main, so "imports" covers loading the rest of the app
+_started = time.perf_counter()
+_last_mark = _started
+
+phases = {}
+
+
+def mark(name):
+    # Record the time since the previous mark, e.g. for module imports
+    global _last_mark
+    now = time.perf_counter()
+    phases[name] = now - _last_mark
+    _last_mark = now
+
+
+@contextmanager
+def phase(name):
+    global _last_mark
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _last_mark = time.perf_counter()
+        phases[name] = _last_mark - start
+
+
+def report():
+    for name, seconds in phases.items():
+        STARTUP_PHASES.set(seconds, name)
+    total = time.perf_counter() - _started
+    STARTUP_PHASES.set(total, "total")
+    breakdown = " | ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in phases.items())
+    logging.info(f"Startup: {breakdown} | total {total * 1000:.0f}ms")
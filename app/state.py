@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import time
+from app import records
+
+# Fields that change on every fetch without the underlying reading changing
+VOLATILE_FIELDS = ("last_update",)
+
+KEY_PREFIX = "state/"
+
+
+def _comparable(value):
+    if isinstance(value, dict):
+        return {k: v for k, v in value.items() if k not in VOLATILE_FIELDS}
+    return value
+
+
+class StateStore:
+    """Latest value of every source, with change notifications for subscribers.
+
+    With a shared backend attached, the leader publishes every value it sets and
+    the other workers pull them with sync(), so all workers serve the same data.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.publishing = False
+        self.revision = 0  # Bumped on every update, so readers can cache anything derived from the state
+        self._values = {}
+        self._updated = {}
+        self._raw = {}
+        self._events = {}
+        self._subscribers = []
+        self._listeners = []
+
+    def get(self, name, default=None):
+        return self._values.get(name, default)
+
+    def updated_at(self, name):
+        return self._updated.get(name)
+
+    def items(self):
+        return list(self._values.items())
+
+    def subscribe(self, callback, all_updates=False):
+        # callback(name, value, previous) is called only when a value actually changes,
+        # unless all_updates is set (e.g. for history, which samples every poll)
+        (self._listeners if all_updates else self._subscribers).append(callback)
+
+    def unsubscribe(self, callback):
+        for callbacks in (self._listeners, self._subscribers):
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def set(self, name, value):
+        changed = self._apply(name, value, time.time())
+        if self.publishing and self.backend is not None:
+            self._publish(name)
+        return changed
+
+    def restore(self, name, value, updated):
+        # Load a value saved by an earlier run without treating it as a fresh reading
+        if name not in self._values:
+            self._apply(name, value, updated)
+
+    def publish_all(self):
+        for name in list(self._values):
+            self._publish(name)
+
+    def snapshot(self):
+        return {name: {"value": value, "updated": self._updated[name]} for name, value in self._values.items()}
+
+    def _publish(self, name):
+        record = {"value": self._values[name], "updated": self._updated[name]}
+        blob = records.dumps(record).encode()
+        if self._raw.get(KEY_PREFIX + name) != blob:
+            self._raw[KEY_PREFIX + name] = blob
+            self.backend.write(KEY_PREFIX + name, blob)
+
+    def sync(self):
+        # Pull values published by the leader; only entries whose bytes changed are decoded
+        for key, blob in self.backend.read_all(KEY_PREFIX).items():
+            if self._raw.get(key) == blob:
+                continue
+            self._raw[key] = blob
+            record = records.loads(blob)
+            self._apply(key[len(KEY_PREFIX):], record["value"], record["updated"])
+
+    async def wait_for(self, name, timeout):
+        if name not in self._values:
+            event = self._events.setdefault(name, asyncio.Event())
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self._values.get(name)
+
+    def _apply(self, name, value, updated):
+        previous = self._values.get(name)
+        self._values[name] = value
+        self._updated[name] = updated
+        self.revision += 1
+        event = self._events.pop(name, None)
+        if event is not None:
+            event.set()
+
+        changed = previous is None or _comparable(value) != _comparable(previous)
+        callbacks = self._listeners + self._subscribers if changed else self._listeners
+        for callback in callbacks:
+            try:
+                callback(name, value, previous)
+            except Exception as e:
+                logging.exception(f"State subscriber failed for {name}: {e}")
+        return changed
+
+
+store = StateStore()
@@ -0,0 +1,201 @@
+import time
+import pytz
+from collections import defaultdict
+from datetime import datetime
+from app.sites import DEFAULT_SITE, SITES, parse_key, state_key
+from app.state import store
+from app.upstream import failed_feeds
+
+PACIFIC_TZ = pytz.timezone("America/Los_Angeles")
+
+# Score thresholds, highest first. Anything below the last one is LOW.
+LEVELS = [
+    (4.0, "SEVERE", "red"),
+    (3.0, "HIGH", "orange"),
+    (0.5, "ELEVATED", "yellow"),
+]
+LOW = ("LOW", "#00ff00")
+
+MIN_CONTRIBUTION = 0.1   # Factors that have decayed below this are dropped
+DECAY_REFRESH = 30       # Seconds before a cached score is re-decayed on read
+
+QUAKE_RADIUS_MI = 150    # Quakes further than this don't contribute
+
+
+def _motion(data):
+    if data.get("last_motion"):
+        return 1.0, datetime.fromisoformat(data["last_motion"]).timestamp()
+    return None
+
+
+def _traffic(data):
+    if data.get("major_incident"):
+        return 1.0, None
+    return None
+
+
+def _weather(data):
+    if data.get("alerts"):
+        return (1.0 if data.get("severe_alert") else 0.75), None
+    return None
+
+
+def _quakes(data):
+    best = None
+    for quake in data.get("quakes") or []:
+        magnitude = min(max((quake.mag - 2.5) / 3.5, 0.0), 1.0)
+        proximity = max(1.0 - quake.distance / QUAKE_RADIUS_MI, 0.0)
+        severity = magnitude * proximity
+        if severity > 0 and (best is None or severity > best[0]):
+            best = (severity, quake.time)
+    return best
+
+
+def _tsunami(data):
+    if data.get("major_quake"):
+        return 1.0, None
+    return None
+
+
+def _crime(data):
+    if data.get("violent_crime"):
+        return 1.0, None
+    return None
+
+
+def _outage(data):
+    if data.get("major_outage"):
+        return 1.0, None
+    return None
+
+
+def _geopolitical(data):
+    if data.get("major_event"):
+        return 1.0, None
+    return None
+
+
+# Each rule turns one source's data into (severity 0..1, since epoch or None).
+# Contribution = weight * severity * max(floor, 0.5 ** (age / half_life)).
+# When a rule doesn't report a start time, the first time it was seen active is used.
+# A rule with "feeds" keeps its previous result while one of those sub-feeds is failing,
+# unless what was fetched is enough to trigger it.
+# While a source or feed is failing its factors are held as stale, for at most stale_after
+# seconds (a few of the source's poll intervals), so an outage can't pin the level up.
+RULES = [
+    {"name": "motion", "source": "motion", "label": "Front door motion", "weight": 1.5, "half_life": 120, "floor": 0.0, "stale_after": 3 * 30, "evaluate": _motion},
+    {"name": "traffic", "source": "traffic", "label": "Major traffic incident", "weight": 1.0, "half_life": 3600, "floor": 0.5, "stale_after": 3 * 120, "evaluate": _traffic},
+    {"name": "weather", "source": "weather", "label": "Weather alerts", "weight": 1.0, "half_life": None, "floor": 1.0, "stale_after": 3 * 300, "evaluate": _weather, "feeds": ("Alerts",)},
+    {"name": "quake", "source": "earthquake", "label": "Nearby earthquake", "weight": 2.0, "half_life": 6 * 3600, "floor": 0.0, "stale_after": 3 * 300, "evaluate": _quakes, "feeds": ("USGS",)},
+    {"name": "tsunami", "source": "earthquake", "label": "Major earthquake or tsunami", "weight": 2.0, "half_life": None, "floor": 1.0, "stale_after": 3 * 300, "evaluate": _tsunami, "feeds": ("Tsunami",)},
+    {"name": "crime", "source": "crime", "label": "Local violent crime", "weight": 1.0, "half_life": 24 * 3600, "floor": 0.5, "stale_after": 3 * 600, "evaluate": _crime},
+    {"name": "outage", "source": "hazard", "label": "Major utility outage", "weight": 1.0, "half_life": None, "floor": 1.0, "stale_after": 3 * 600, "evaluate": _outage, "feeds": ("PUD", "PSE", "Xfinity")},
+    {"name": "geopolitical", "source": "geopolitical", "label": "Geopolitical threat", "weight": 1.0, "half_life": None, "floor": 1.0, "stale_after": 3 * 900, "evaluate": _geopolitical, "feeds": ("NTAS", "CAP")},
+]
+
+
+def _decay(rule, since, now):
+    if not rule["half_life"]:
+        return 1.0
+    age = max(now - since, 0.0)
+    return max(rule["floor"], 0.5 ** (age / rule["half_life"]))
+
+
+class ThreatEngine:
+    """Weighted, time-decaying threat score for one site that is only re-evaluated when a source changes."""
+
+    def __init__(self, site=DEFAULT_SITE, rules=RULES, levels=LEVELS, state=store):
+        self.site = site
+        self.rules_by_source = defaultdict(list)
+        for rule in rules:
+            self.rules_by_source[rule["source"]].append(rule)
+        self.levels = levels
+        self.state = state
+        self._active = {}  # rule name -> (rule, severity, since, last confirmed)
+        self._held = set()  # Rule names kept from before their source started failing
+        self._current = None
+        self._computed_at = 0.0
+
+    def _source(self, key):
+        # Source name if the state key belongs to this site (shared sources belong to every site)
+        source, site = parse_key(key)
+        return source if site in (None, self.site) else None
+
+    def on_change(self, key, data, previous=None):
+        source = self._source(key)
+        if source in self.rules_by_source:
+            now = time.time()
+            self._evaluate(source, data, now)
+            self._recompute(now)
+
+    def rebuild(self, items):
+        # Re-derive every factor from current state, e.g. after taking over as leader
+        now = time.time()
+        self._active.clear()
+        self._held.clear()
+        for key, data in items:
+            source = self._source(key)
+            if source is not None:
+                self._evaluate(source, data, now)
+        self._recompute(now)
+
+    def _evaluate(self, source, data, now):
+        # A failed fetch says nothing about the condition; hold the factors until they go stale
+        failed = failed_feeds(data)
+        for rule in self.rules_by_source.get(source, []):
+            result = rule["evaluate"](data) if "error" not in data else None
+            if result is None and ("error" in data or failed.intersection(rule.get("feeds", ()))):
+                if rule["name"] in self._active:
+                    self._held.add(rule["name"])
+                continue
+            self._held.discard(rule["name"])
+            if result is None:
+                self._active.pop(rule["name"], None)
+                continue
+            severity, since = result
+            if since is None:
+                active = self._active.get(rule["name"])
+                since = active[2] if active else now
+            self._active[rule["name"]] = (rule, severity, since, now)
+
+    def _recompute(self, now):
+        factors = []
+        for name, (rule, severity, since, confirmed) in list(self._active.items()):
+            if name in self._held and now - confirmed > rule["stale_after"]:
+                del self._active[name]
+                self._held.discard(name)
+                continue
+            contribution = rule["weight"] * severity * _decay(rule, since, now)
+            if contribution >= MIN_CONTRIBUTION:
+                factors.append({
+                    "name": rule["name"],
+                    "source": rule["source"],
+                    "label": rule["label"],
+                    "severity": round(severity, 2),
+                    "contribution": round(contribution, 2),
+                    "since": since,
+                    "stale": name in self._held,
+                })
+        factors.sort(key=lambda f: f["contribution"], reverse=True)
+
+        score = sum(f["contribution"] for f in factors)
+        level, color = LOW
+        for threshold, name, level_color in self.levels:
+            if score >= threshold:
+                level, color = name, level_color
+                break
+
+        self._current = {"level": level, "color": color, "score": round(score, 2), "factors": factors,
+                         "last_update": datetime.now(PACIFIC_TZ).strftime("%H:%M:%S")}
+        self._computed_at = now
+        self.state.set(state_key("threat", self.site), self._current)
+
+    def current(self):
+        now = time.time()
+        if self._current is None or (self._active and now - self._computed_at >= DECAY_REFRESH):
+            self._recompute(now)
+        return self._current
+
+
+engines = {slug: ThreatEngine(slug) for slug in SITES}
+engine = engines[DEFAULT_SITE]
@@ -1,19 +1,99 @@
-import httpx
+from app.records import Incident
+from app.sites import SITES, SiteIndex
+from app.upstream import upstream_client
+from collections import defaultdict
 from datetime import datetime, timedelta
+import os
 import pytz
 
 PACIFIC_TZ = pytz.timezone("America/Los_Angeles")
 
-ACCESS_CODE = "573baea1-57ec-4cd7-9532-43c89b8bb4b0"
+ACCESS_CODE = os.getenv("WSDOT_ACCESS_CODE", "")  # From .env
 
+# Statewide feed, fetched once and split between sites
 ALERTS_URL = f"https://wsdot.wa.gov/Traffic/api/HighwayAlerts/HighwayAlertsREST.svc/GetAlertsAsJson?AccessCode={ACCESS_CODE}"
 
+MAX_INCIDENTS = 10  # Per route
+
 first_load = True
 
-async def get_traffic_data():
+def alert_location(alert):
+    # Where the incident starts; WSDOT sends 0/0 when it doesn't know
+    location = alert.get("StartRoadwayLocation") or {}
+    lat, lon = location.get("Latitude"), location.get("Longitude")
+    return (lat, lon) if lat and lon else None
+
+def filter_alerts(alerts, now, cutoff, sites=SITES):
+    # Fan the statewide feed out to sites: alerts on one of a site's routes (by keyword),
+    # or within its traffic radius. Each keyword is checked once per alert however many sites use it.
+    sites = list(sites.values())
+    keywords = defaultdict(list)  # keyword -> [(site slug, route key)]
+    for site in sites:
+        for route in site.routes:
+            for keyword in route.keywords:
+                keywords[keyword].append((site.slug, route.key))
+    index = SiteIndex(sites, lambda site: site.traffic_radius_mi)
+
+    matched = {site.slug: defaultdict(list) for site in sites}  # slug -> route key (or "nearby") -> incidents
+    major_incident = {site.slug: False for site in sites}
+
+    for alert in alerts:
+        start_time_str = alert.get("StartTime") or ""
+        try:
+            start_time = datetime.fromisoformat(start_time_str.replace("Z", "+00:00")).astimezone(PACIFIC_TZ)
+        except ValueError:
+            start_time = now
+
+        if start_time < cutoff:
+            continue
+
+        headline = alert.get("HeadlineDescription", "Unknown incident").lower()
+        category = alert.get("EventCategory", "Alert")
+        priority = alert.get("Priority", "Low")
+
+        targets = {}
+        for keyword, routes in keywords.items():
+            if keyword in headline:
+                for slug, route_key in routes:
+                    targets[slug, route_key] = True
+        location = alert_location(alert)
+        if location is not None:
+            for site, _ in index.near(*location):
+                if not any(slug == site.slug for slug, _ in targets):
+                    targets[site.slug, "nearby"] = True
+        if not targets:
+            continue
+
+        # Major incident detection
+        major = priority in ["High", "Highest"] or any(word in headline for word in ["closure", "blocked", "crash", "accident"])
+
+        incident = Incident(
+            when=start_time.strftime("%m/%d %H:%M"),
+            category=category,
+            description=alert.get("HeadlineDescription", "Unknown incident"),
+            priority=priority,
+            severe=major,
+        )
+        for slug, route_key in targets:
+            matched[slug][route_key].append(incident)
+            major_incident[slug] = major_incident[slug] or major
+
+    views = {}
+    for site in sites:
+        routes = [{"key": route.key, "label": route.label, "incidents": matched[site.slug][route.key]}
+                  for route in site.routes]
+        if site.traffic_radius_mi:
+            routes.append({"key": "nearby", "label": f"Within {site.traffic_radius_mi:g} miles",
+                           "incidents": matched[site.slug]["nearby"]})
+        for route in routes:
+            route["incidents"] = sorted(route["incidents"], key=lambda x: x.when, reverse=True)[:MAX_INCIDENTS]
+        views[site.slug] = {"routes": routes, "major_incident": major_incident[site.slug]}
+    return views
+
+async def get_traffic_data(sites=SITES):
     global first_load
 
-    async with httpx.AsyncClient() as client:
+    async with upstream_client() as client:
         try:
             resp = await client.get(ALERTS_URL, timeout=15.0)
             resp.raise_for_status()
@@ -22,61 +102,16 @@ async def get_traffic_data():
             now = datetime.now(PACIFIC_TZ)
             cutoff = now - timedelta(days=14 if first_load else 0)
 
-            highway2_incidents = []
-            highway522_incidents = []
-            major_incident = False
-
-            for alert in alerts:
-                start_time_str = alert.get("StartTime", "")
-                try:
-                    start_time = datetime.fromisoformat(start_time_str.replace("Z", "+00:00")).astimezone(PACIFIC_TZ)
-                except:
-                    start_time = now
-
-                if start_time < cutoff:
-                    continue
-
-                headline = alert.get("HeadlineDescription", "Unknown incident").lower()
-                category = alert.get("EventCategory", "Alert")
-                priority = alert.get("Priority", "Low")
-
-                # Major incident detection
-                if priority in ["High", "Highest"] or any(word in headline for word in ["closure", "blocked", "crash", "accident"]):
-                    major_incident = True
-
-                incident = {
-                    "HeadlineDescription": alert.get("HeadlineDescription", "Unknown incident"),
-                    "EventCategory": category,
-                    "Priority": priority,
-                    "StartTime": start_time.strftime("%m/%d %H:%M")
-                }
-
-                # ONLY Highway 2 / SR 2 / US 2
-                if any(keyword in headline for keyword in ["sr 2", "us 2", "highway 2", "sr2", "us2", "sr-2", "us-2"]):
-                    highway2_incidents.append(incident)
-
-                # ONLY Highway 522 / SR 522
-                if any(keyword in headline for keyword in ["sr 522", "highway 522", "sr522", "sr-522"]):
-                    highway522_incidents.append(incident)
-
-            highway2_incidents.sort(key=lambda x: x.get("StartTime", ""), reverse=True)
-            highway522_incidents.sort(key=lambda x: x.get("StartTime", ""), reverse=True)
+            views = filter_alerts(alerts, now, cutoff, sites)
 
             if first_load:
                 first_load = False
 
             last_update = now.strftime("%H:%M:%S")
-
-            return {
-                "highway2": "Highway 2 (Everett → Wenatchee)",
-                "highway2_incidents": highway2_incidents[:10],
-                "highway522": "Highway 522 (Monroe → Seattle)",
-                "highway522_incidents": highway522_incidents[:10],
-                "major_incident": major_incident,
-                "congestion_color": "#ff0000" if major_incident else "#00ff00",
-                "last_update": last_update
-            }
+            for view in views.values():
+                view["last_update"] = last_update
+            return views
 
         except Exception as e:
             print(f"Traffic API error: {e}")
-            return {"error": str(e)}
+            return {slug: {"error": str(e)} for slug in sites}
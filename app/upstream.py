@@ -0,0 +1,94 @@
+import asyncio
+import contextvars
+import httpx
+from contextlib import asynccontextmanager
+from app.breaker import get_breaker
+from app.metrics import UPSTREAM_BYTES, UPSTREAM_REQUESTS
+from app.replay import create_transport
+
+# Set by the poller so upstream requests can be attributed to the source that made them
+current_source = contextvars.ContextVar("current_source", default="unknown")
+
+_client = None
+
+
+async def _on_response(response):
+    source = current_source.get()
+    await response.aread()
+    UPSTREAM_REQUESTS.inc(source, str(response.status_code))
+    UPSTREAM_BYTES.inc(source, amount=len(response.content))
+
+
+def get_client():
+    # One pooled client for all fetchers so connections (and TLS sessions) are reused between polls
+    global _client
+    if _client is None or _client.is_closed:
+        # UPSTREAM_MODE=record/replay swaps in the archive transport (see app.replay)
+        _client = httpx.AsyncClient(transport=create_transport(), event_hooks={"response": [_on_response]})
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+class UpstreamClient:
+    """Per-fetcher view of the shared client that adds default headers and a circuit breaker per upstream host."""
+
+    def __init__(self, client, headers=None):
+        self.client = client
+        self.headers = headers or {}
+
+    async def get(self, url, **kwargs):
+        if self.headers:
+            kwargs["headers"] = {**self.headers, **kwargs.get("headers", {})}
+
+        breaker = get_breaker(f"{current_source.get()}/{httpx.URL(url).host}")
+        breaker.before_request()  # Raises CircuitOpen instead of waiting out another timeout
+        try:
+            response = await self.client.get(url, **kwargs)
+        except httpx.TransportError as e:
+            breaker.record_failure(e)
+            raise
+
+        if response.status_code >= 500 or response.status_code == 429:
+            breaker.record_failure(f"HTTP {response.status_code}")
+        else:
+            breaker.record_success()
+        return response
+
+
+@asynccontextmanager
+async def upstream_client(headers=None):
+    # Drop-in for `async with httpx.AsyncClient() as client` that doesn't close the pool
+    yield UpstreamClient(get_client(), headers)
+
+
+async def gather_feeds(client, feeds, label):
+    # Run independent sub-feeds concurrently; a failed feed contributes its fallback values
+    # (None for readings, so nothing looks like an all-clear) and is listed under "partial"
+    # instead of discarding the others. Only fails if all do.
+    results = await asyncio.gather(*(fetch(client) for fetch, _ in feeds.values()), return_exceptions=True)
+
+    data = {}
+    failed = []
+    for (name, (_, fallback)), result in zip(feeds.items(), results):
+        if isinstance(result, Exception):
+            print(f"{label} API error ({name}): {result}")
+            failed.append(f"{name}: {result}")
+            data.update(fallback)
+        else:
+            data.update(result)
+
+    if len(failed) == len(feeds):
+        return {"error": "; ".join(failed)}
+    data["partial"] = failed
+    return data
+
+
+def failed_feeds(data):
+    # Names of the sub-feeds gather_feeds couldn't fetch
+    return {feed.split(":", 1)[0] for feed in data.get("partial", [])}
@@ -1,83 +1,138 @@
-import httpx
+from app.records import Alert
+from app.sites import SITES, AreaIndex
+from app.upstream import gather_feeds, upstream_client
 from datetime import datetime
+from functools import partial
+import asyncio
 import pytz
 import re
 
 PACIFIC_TZ = pytz.timezone("America/Los_Angeles")
 
-# Monroe, WA coordinates for NWS point
-MONROE_LAT = 47.8554
-MONROE_LON = -121.971
-
-# NWS API endpoints
-POINTS_URL = f"https://api.weather.gov/points/{MONROE_LAT},{MONROE_LON}"
-OBSERVATION_URL = "https://api.weather.gov/stations/KPAE/observations/latest"  # Closest station Paine Field
-ALERTS_URL = "https://api.weather.gov/alerts/active?area=WA"  # All active WA alerts, filter for Snohomish
+# NWS API endpoints; observation and forecast are per site, alerts are statewide and split by zone
+ALERTS_URL = "https://api.weather.gov/alerts/active?area=WA"  # All active WA alerts
 STEVENS_PASS_URL = "https://wsdot.com/Travel/Real-time/mountainpasses/Stevens"  # Scrape for road conditions
 
-async def get_weather_data():
-    async with httpx.AsyncClient(headers={"User-Agent": "ThreatDashboard/1.0 (your.email@example.com)"}) as client:
-        try:
-            # Get point data for forecast
-            point_resp = await client.get(POINTS_URL, timeout=10.0)
-            point_resp.raise_for_status()
-            point_data = point_resp.json()
-            forecast_url = point_data["properties"]["forecast"]
-            observation_stations = point_data["properties"]["observationStations"]
-
-            # Current conditions from closest station
-            obs_resp = await client.get(OBSERVATION_URL, timeout=10.0)
-            obs_resp.raise_for_status()
-            obs = obs_resp.json()["properties"]
-
-            current_temp = obs["temperature"]["value"]
-            current_temp_f = round(current_temp * 1.8 + 32) if current_temp is not None else "N/A"
-            conditions = obs["textDescription"] or "Unknown"
-            wind_speed = obs["windSpeed"]["value"] or 0
-            wind_dir = obs["windDirection"]["value"] or 0
-            precip = obs.get("precipitationLastHour", {}).get("value", 0) or 0
-
-            # Forecast for icon (first period)
-            forecast_resp = await client.get(forecast_url, timeout=10.0)
-            forecast_resp.raise_for_status()
-            forecast = forecast_resp.json()["properties"]["periods"][0]
-            icon_url = forecast["icon"]
-
-            # Active alerts for Snohomish County / Puget Sound
-            alerts_resp = await client.get(ALERTS_URL, timeout=10.0)
-            alerts_resp.raise_for_status()
-            alerts = alerts_resp.json()["features"]
-            relevant_alerts = []
-            severe_alert = False
-            for alert in alerts:
-                props = alert["properties"]
-                area = props["areaDesc"]
-                if "Snohomish" in area or "King" in area or "Puget Sound" in area:
-                    relevant_alerts.append(props["headline"])
-                    if props["severity"] in ["Severe", "Extreme"]:
-                        severe_alert = True
-
-            # Stevens Pass road conditions (scrape simple text)
-            stevens_resp = await client.get(STEVENS_PASS_URL, timeout=10.0)
-            stevens_resp.raise_for_status()
-            stevens_text = stevens_resp.text
-            conditions_match = re.search(r"Conditions:</strong>(.*?)</p>", stevens_text, re.DOTALL)
-            restrictions_match = re.search(r"Restrictions.*?</strong>(.*?)</p>", stevens_text, re.DOTALL)
-            stevens_conditions = conditions_match.group(1).strip().replace("<br/>", " ") if conditions_match else "Unknown"
-            stevens_restrictions = restrictions_match.group(1).strip() if restrictions_match else "None"
-
-            return {
-                "current_temp": current_temp_f,
-                "conditions": conditions,
-                "wind": f"{wind_speed:.0f} mph from {wind_dir}°" if wind_speed else "Calm",
-                "precip": precip,
-                "icon_url": icon_url,
-                "alerts": relevant_alerts,
-                "severe_alert": severe_alert,
-                "stevens_conditions": stevens_conditions,
-                "stevens_restrictions": stevens_restrictions,
-                "last_update": datetime.now(PACIFIC_TZ).strftime("%H:%M:%S")
-            }
-        except Exception as e:
-            print(f"Weather API error: {e}")
-            return {"error": str(e)}
+
+def points_url(site):
+    return f"https://api.weather.gov/points/{site.lat},{site.lon}"
+
+
+def observation_url(site):
+    return f"https://api.weather.gov/stations/{site.observation_station}/observations/latest"
+
+
+async def _observation(client, site):
+    # Current conditions from the site's closest station
+    obs_resp = await client.get(observation_url(site), timeout=10.0)
+    obs_resp.raise_for_status()
+    obs = obs_resp.json()["properties"]
+
+    current_temp = obs["temperature"]["value"]
+    return {
+        "current_temp": round(current_temp * 1.8 + 32) if current_temp is not None else None,
+        "conditions": obs["textDescription"] or "Unknown",
+        "wind_speed": obs["windSpeed"]["value"] or 0,
+        "wind_direction": obs["windDirection"]["value"] or 0,
+        "precip": obs.get("precipitationLastHour", {}).get("value", 0) or 0,
+    }
+
+
+async def _forecast_icon(client, site):
+    # Get point data for forecast, then the icon for the first period
+    point_resp = await client.get(points_url(site), timeout=10.0)
+    point_resp.raise_for_status()
+    forecast_url = point_resp.json()["properties"]["forecast"]
+
+    forecast_resp = await client.get(forecast_url, timeout=10.0)
+    forecast_resp.raise_for_status()
+    forecast = forecast_resp.json()["properties"]["periods"][0]
+    return {"icon_url": forecast["icon"]}
+
+
+async def _alerts(client, sites):
+    # Active WA alerts, fetched once and split between sites
+    alerts_resp = await client.get(ALERTS_URL, timeout=10.0)
+    alerts_resp.raise_for_status()
+    return parse_alerts(alerts_resp.json()["features"], sites)
+
+
+def parse_alerts(alerts, sites=SITES):
+    # -> {site slug: {"alerts", "severe_alert"}}, matching each alert's areaDesc against the sites' NWS zones
+    index = AreaIndex(sites.values())
+    views = {slug: {"alerts": [], "severe_alert": False} for slug in sites}
+    for alert in alerts:
+        props = alert["properties"]
+        area = props["areaDesc"]
+        matched = index.sites_for(area)
+        if not matched:
+            continue
+        record = Alert(event=props["event"], headline=props["headline"], severity=props["severity"], area=area)
+        for site in matched:
+            views[site.slug]["alerts"].append(record)
+            if props["severity"] in ["Severe", "Extreme"]:
+                views[site.slug]["severe_alert"] = True
+    return views
+
+
+async def _site_alerts(client, alerts, slug):
+    return (await alerts)[slug]
+
+
+async def _shared(client, result):
+    return await result
+
+
+async def _stevens_pass(client):
+    # Stevens Pass road conditions (scrape simple text)
+    stevens_resp = await client.get(STEVENS_PASS_URL, timeout=10.0)
+    stevens_resp.raise_for_status()
+    return parse_stevens_pass(stevens_resp.text)
+
+
+def parse_stevens_pass(stevens_text):
+    conditions_match = re.search(r"Conditions:</strong>(.*?)</p>", stevens_text, re.DOTALL)
+    restrictions_match = re.search(r"Restrictions.*?</strong>(.*?)</p>", stevens_text, re.DOTALL)
+    return {
+        "stevens_conditions": conditions_match.group(1).strip().replace("<br/>", " ") if conditions_match else "Unknown",
+        "stevens_restrictions": restrictions_match.group(1).strip() if restrictions_match else "None",
+    }
+
+
+# Sub-feed name -> values to show if it fails. One failing feed doesn't discard the others.
+FALLBACKS = {
+    "Observation": {"current_temp": None, "conditions": "Unavailable", "wind_speed": None,
+                    "wind_direction": None, "precip": None},
+    "Forecast": {"icon_url": None},
+    "Alerts": {"alerts": None, "severe_alert": None},
+    "Stevens Pass": {"stevens_conditions": "Unavailable", "stevens_restrictions": "Unavailable"},
+}
+
+
+def site_feeds(site, alerts, stevens):
+    # Sub-feed name -> (fetcher, fallback) for one site; alerts and the pass report are shared tasks
+    fetchers = {
+        "Observation": partial(_observation, site=site),
+        "Forecast": partial(_forecast_icon, site=site),
+        "Alerts": partial(_site_alerts, alerts=alerts, slug=site.slug),
+        "Stevens Pass": partial(_shared, result=stevens),
+    }
+    return {name: (fetch, FALLBACKS[name]) for name, fetch in fetchers.items()}
+
+
+async def get_weather_data(sites=SITES):
+    async with upstream_client(headers={"User-Agent": "ThreatDashboard/1.0 (your.email@example.com)"}) as client:
+        # Statewide feeds are requested once however many sites there are
+        alerts = asyncio.ensure_future(_alerts(client, sites))
+        stevens = asyncio.ensure_future(_stevens_pass(client))
+        results = await asyncio.gather(*(
+            gather_feeds(client, site_feeds(site, alerts, stevens), f"Weather {site.name}")
+            for site in sites.values()
+        ))
+
+    last_update = datetime.now(PACIFIC_TZ).strftime("%H:%M:%S")
+    views = dict(zip(sites, results))
+    for data in views.values():
+        if "error" not in data:
+            data["last_update"] = last_update
+    return views
@@ -0,0 +1,44 @@
+"""Motion pipeline benchmark: frame differencing and contour counting at several resolutions.
+
+    python -m benchmarks.bench_motion [--resolutions 480p,720p,1080p,4k]
+"""
+import argparse
+from app.camera import count_motion_contours
+from benchmarks import synthetic
+from benchmarks.common import print_table, run_timed, write_results
+
+RESOLUTIONS = {
+    "480p": (640, 480),
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "4k": (3840, 2160),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resolutions", default=",".join(RESOLUTIONS))
+    parser.add_argument("--number", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    import cv2
+    results = {}
+    for name in args.resolutions.split(","):
+        width, height = RESOLUTIONS[name]
+        for moving in (False, True):
+            frame1, frame2 = synthetic.frame_pair(width, height, moving=moving)
+            timing = run_timed(lambda: count_motion_contours(frame1, frame2), args.number, args.repeat)
+            contours, large = count_motion_contours(frame1, frame2)
+            timing["contours"] = len(contours)
+            timing["large_contours"] = large
+            timing["mpixels_per_s"] = width * height / 1e6 / (timing["best_ms"] / 1000)
+            results[f"{name} {'motion' if moving else 'still'}"] = timing
+
+    print_table(results, ["contours", "large_contours", "best_ms", "median_ms", "mpixels_per_s"])
+    params = {**vars(args), "opencv": cv2.__version__, "threads": cv2.getNumThreads()}
+    print(f"Results written to {write_results('motion', results, params)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Microbenchmarks for the feed parsers and transformers on large synthetic inputs.
+
+    python -m benchmarks.bench_parsers [--scale 1.0]
+"""
+import argparse
+from datetime import datetime, timedelta
+from app import crime, earthquake, geopolitical, hazard, traffic, weather
+from benchmarks import synthetic
+from benchmarks.common import print_table, run_timed, write_results
+
+
+def cases(scale):
+    def n(count):
+        return max(int(count * scale), 1)
+
+    alerts = synthetic.wsdot_alerts(n(5000))
+    now = datetime.now(traffic.PACIFIC_TZ)
+    cutoff = now - timedelta(days=14)
+
+    features = synthetic.usgs_features(n(1000))
+    nws = synthetic.nws_alerts(n(2000))
+    crime_html = synthetic.crime_page(n(2000))
+    rss = synthetic.ntas_rss(n(1000))
+    cap = synthetic.cap_feed(n(1000))
+    pud = synthetic.scraped_page("Current outages: 1,204 customers", size_kb=n(500))
+    pse = synthetic.scraped_page("Natural gas: no outages", size_kb=n(500))
+    xfinity = synthetic.scraped_page("No problems at Comcast", size_kb=n(500))
+    stevens = synthetic.stevens_page()
+    many = synthetic.sites(n(100))
+
+    # name -> (callable, items processed per call, iterations per timing)
+    return {
+        "traffic.filter_alerts": (lambda: traffic.filter_alerts(alerts, now, cutoff), len(alerts), 5),
+        f"traffic.filter_alerts[{len(many)} sites]": (lambda: traffic.filter_alerts(alerts, now, cutoff, many), len(alerts), 5),
+        "earthquake.parse_quake": (lambda: [earthquake.parse_quake(f) for f in features], len(features), 5),
+        f"earthquake.quakes_by_site[{len(many)} sites]": (lambda: earthquake.quakes_by_site(features, many), len(features), 5),
+        "earthquake.parse_tsunami": (lambda: earthquake.parse_tsunami(nws), len(nws), 50),
+        "weather.parse_alerts": (lambda: weather.parse_alerts(nws), len(nws), 50),
+        f"weather.parse_alerts[{len(many)} sites]": (lambda: weather.parse_alerts(nws, many), len(nws), 20),
+        "weather.parse_stevens_pass": (lambda: weather.parse_stevens_pass(stevens), 1, 20),
+        "crime.parse_crime_page": (lambda: crime.parse_crime_page(crime_html), n(2000), 10),
+        "geopolitical.parse_ntas": (lambda: geopolitical.parse_ntas(rss), n(1000), 10),
+        "geopolitical.parse_cap": (lambda: geopolitical.parse_cap(cap), n(1000), 10),
+        "hazard.parse_pud": (lambda: hazard.parse_pud(pud), 1, 20),
+        "hazard.parse_pse": (lambda: hazard.parse_pse(pse), 1, 20),
+        "hazard.parse_xfinity": (lambda: hazard.parse_xfinity(xfinity), 1, 20),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every input size by this factor")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    results = {}
+    for name, (fn, items, number) in cases(args.scale).items():
+        timing = run_timed(fn, number, args.repeat)
+        timing["items"] = items
+        timing["us_per_item"] = timing["best_ms"] * 1000 / items
+        results[name] = timing
+
+    print_table(results, ["items", "best_ms", "median_ms", "us_per_item"])
+    print(f"Results written to {write_results('parsers', results, vars(args))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_timed(fn, number, repeat=5):
+    # Best-of-N like timeit, plus the median so noisy runs are visible
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - start) / number)
+    return {
+        "iterations": number,
+        "repeat": repeat,
+        "best_ms": min(timings) * 1000,
+        "median_ms": statistics.median(timings) * 1000,
+    }
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(int(round(pct / 100 * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+def write_results(suite, results, params=None):
+    # One JSON file per run, named so runs sort by time; compare them across versions
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    now = datetime.now(timezone.utc)
+    report = {
+        "suite": suite,
+        "timestamp": now.isoformat(),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": params or {},
+        "results": results,
+    }
+    path = os.path.join(RESULTS_DIR, f"{suite}-{now.strftime('%Y%m%dT%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def print_table(results, columns):
+    width = max(len(name) for name in results)
+    print(f"{'':<{width}}  " + "  ".join(f"{c:>12}" for c in columns))
+    for name, row in results.items():
+        cells = [f"{row[c]:>12.3f}" if isinstance(row.get(c), float) else f"{str(row.get(c, '')):>12}" for c in columns]
+        print(f"{name:<{width}}  " + "  ".join(cells))
+    sys.stdout.flush()
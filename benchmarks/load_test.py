@@ -0,0 +1,235 @@
+"""End-to-end load test: N simulated dashboards against a local server replaying synthetic upstreams.
+
+Starts uvicorn with UPSTREAM_MODE=replay (no network needed) and a synthetic camera, then has
+every client load the page and poll each card on its hx-trigger schedule, sped up by --time-scale.
+
+    python -m benchmarks.load_test --clients 50 --duration 60 --time-scale 30
+"""
+import argparse
+import asyncio
+import os
+import random
+import re
+import secrets
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+import httpx
+from benchmarks import synthetic
+from benchmarks.common import percentile, print_table, write_results
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def polled_fragments():
+    # hx-get URL -> polling interval, read from the templates so the test follows the real dashboard
+    fragments = {}
+    for name in ("base.html", "dashboard.html"):
+        with open(os.path.join(ROOT, "templates", name)) as f:
+            html = f.read()
+        for url, interval in re.findall(r'hx-get="([^"]+)"\s+hx-trigger="load, every (\d+)s"', html):
+            fragments[url] = int(interval)
+    return fragments
+
+
+def process_tree(pid):
+    children = defaultdict(list)
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+                children[ppid].append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    pids = [pid]
+    for parent in pids:
+        pids.extend(children.get(parent, []))
+    return pids
+
+
+def sample_usage(pid):
+    # Total CPU seconds and resident memory of the server and its workers
+    cpu = 0.0
+    rss = 0
+    for p in process_tree(pid):
+        try:
+            with open(f"/proc/{p}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            cpu += (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+            with open(f"/proc/{p}/statm") as f:
+                rss += int(f.read().split()[1]) * PAGE_SIZE
+        except (OSError, IndexError, ValueError):
+            continue
+    return cpu, rss
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def get(self, client, url):
+        label = url if not url.startswith("/assets/") else "/assets/*"
+        start = time.perf_counter()
+        try:
+            response = await client.get(url)
+        except httpx.HTTPError:
+            self.errors[label] += 1
+            return None
+        self.latencies[label].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[label] += 1
+        return response
+
+
+async def dashboard(client, recorder, fragments, time_scale, deadline):
+    # Initial page load: HTML, assets, then every card's "load" trigger
+    page = await recorder.get(client, "/")
+    if page is not None:
+        for asset in re.findall(r'(?:src|href)="(/assets/[^"]+)"', page.text):
+            await recorder.get(client, asset)
+    await asyncio.gather(*(recorder.get(client, url) for url in fragments))
+
+    async def poll(url, interval):
+        period = interval / time_scale
+        # Clients opened the page at different times, so their timers are out of phase
+        await asyncio.sleep(random.uniform(0, period))
+        while time.monotonic() < deadline:
+            await recorder.get(client, url)
+            await asyncio.sleep(period)
+
+    await asyncio.gather(*(poll(url, interval) for url, interval in fragments.items()))
+
+
+async def wait_ready(base_url, auth, timeout=60):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url, auth=auth) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/threat-level")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError("Server did not become ready")
+
+
+async def run(args, base_url, auth, server_pid):
+    fragments = polled_fragments()
+    recorder = Recorder()
+    samples = []
+
+    async def sampler():
+        while True:
+            samples.append((time.monotonic(), *sample_usage(server_pid)))
+            await asyncio.sleep(1)
+
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(base_url=base_url, auth=auth, limits=limits, timeout=30.0,
+                                 headers={"Accept-Encoding": "gzip"}) as client:
+        sampling = asyncio.create_task(sampler())
+        start = time.monotonic()
+        deadline = start + args.duration
+        await asyncio.gather(*(
+            dashboard(client, recorder, fragments, args.time_scale, deadline) for _ in range(args.clients)
+        ))
+        elapsed = time.monotonic() - start
+        sampling.cancel()
+    samples.append((time.monotonic(), *sample_usage(server_pid)))
+    return recorder, samples, elapsed
+
+
+def summarize(recorder, samples, elapsed):
+    results = {}
+    everything = []
+    for label in sorted(set(recorder.latencies) | set(recorder.errors)):
+        latencies = recorder.latencies[label]
+        everything.extend(latencies)
+        results[label] = {
+            "requests": len(latencies),
+            "errors": recorder.errors[label],
+            "p50_ms": percentile(latencies, 50) * 1000 if latencies else None,
+            "p99_ms": percentile(latencies, 99) * 1000 if latencies else None,
+        }
+    results["total"] = {
+        "requests": len(everything),
+        "errors": sum(recorder.errors.values()),
+        "p50_ms": percentile(everything, 50) * 1000 if everything else None,
+        "p99_ms": percentile(everything, 99) * 1000 if everything else None,
+        "requests_per_s": len(everything) / elapsed,
+    }
+
+    (t0, cpu0, _), (t1, cpu1, _) = samples[0], samples[-1]
+    server = {
+        "cpu_percent": (cpu1 - cpu0) / (t1 - t0) * 100 if t1 > t0 else None,
+        "rss_mb_peak": max(rss for _, _, rss in samples) / 2**20,
+        "rss_mb_end": samples[-1][2] / 2**20,
+    }
+    return results, server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=20, help="Concurrent simulated dashboards")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to run after the first page loads")
+    parser.add_argument("--time-scale", type=float, default=30, help="Poll this many times faster than the real dashboard")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--upstream-latency-ms", type=float, default=50, help="Replay delay for each upstream response")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12, help="Cost of the test password hash (production uses 12)")
+    parser.add_argument("--server-log", help="Write the server's log here instead of discarding it")
+    parser.add_argument("--traffic-alerts", type=int, default=500, help="Size of the synthetic WSDOT feed")
+    args = parser.parse_args()
+
+    from passlib.hash import bcrypt
+    password = secrets.token_urlsafe(12)
+    auth = ("admin", password)
+
+    with tempfile.TemporaryDirectory(prefix="threat-load-") as tmp:
+        env = {
+            **os.environ,
+            "UPSTREAM_MODE": "replay",
+            "UPSTREAM_ARCHIVE": synthetic.write_archive(os.path.join(tmp, "upstream.jsonl.gz"),
+                                                        traffic_alerts=args.traffic_alerts),
+            "REPLAY_LATENCY": str(args.upstream_latency_ms),
+            "CAMERA_SOURCE": synthetic.write_frames(os.path.join(tmp, "frames")),
+            "STATE_BACKEND": "memory" if args.workers == 1 else f"file://{tmp}/shared",
+            "HISTORY_DB": os.path.join(tmp, "history.db"),
+            "SNAPSHOT_PATH": os.path.join(tmp, "snapshot.json"),
+            "DASHBOARD_PASSWORD_HASH": bcrypt.using(rounds=args.bcrypt_rounds).hash(password),
+        }
+        log = open(args.server_log, "w") if args.server_log else subprocess.DEVNULL
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port),
+             "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+            cwd=ROOT, env=env, stdout=log, stderr=log,
+        )
+        base_url = f"http://127.0.0.1:{args.port}"
+        try:
+            asyncio.run(wait_ready(base_url, auth))
+            recorder, samples, elapsed = asyncio.run(run(args, base_url, auth, server.pid))
+        finally:
+            server.send_signal(signal.SIGINT)
+            try:
+                server.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                server.kill()
+            if args.server_log:
+                log.close()
+
+    results, usage = summarize(recorder, samples, elapsed)
+    print_table(results, ["requests", "errors", "p50_ms", "p99_ms"])
+    print(f"{results['total']['requests_per_s']:.1f} req/s, server CPU {usage['cpu_percent']:.0f}%, "
+          f"RSS peak {usage['rss_mb_peak']:.0f} MB")
+    path = write_results("load", {"endpoints": results, "server": usage}, vars(args))
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Synthetic upstream payloads and camera frames, shaped like the real feeds but much larger."""
+import base64
+import gzip
+import json
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from app import crime, geopolitical, hazard, traffic, weather
+from app.earthquake import sites_query_url
+from app.replay import request_key
+from app.sites import MONROE, SITES, Route, Site
+
+HIGHWAYS = ["SR 2", "US 2", "SR 522", "I-5", "I-405", "SR 9", "SR 203"]
+HEADLINES = ["Collision blocking right lane", "Roadwork", "Crash near milepost", "Lane closure",
+             "Disabled vehicle", "Debris in roadway", "Maintenance"]
+CRIME_TYPES = ["Theft", "Burglary", "Assault", "Vandalism", "Robbery", "Vehicle Theft", "Fraud"]
+AREAS = ["Snohomish", "King", "Puget Sound", "Chelan", "Spokane", "Yakima"]
+
+
+def sites(count, seed=7):
+    # Site profiles spread over western Washington, sharing the feeds' highways and zones
+    rng = random.Random(seed)
+    return {
+        f"site{i}": Site(
+            slug=f"site{i}", name=f"Site {i}",
+            lat=MONROE.lat + rng.uniform(-1.5, 1.5), lon=MONROE.lon + rng.uniform(-1.5, 1.5),
+            zip_code=f"98{i:03d}", observation_station="KPAE",
+            nws_areas=(rng.choice(AREAS),),
+            routes=(Route("main", rng.choice(HIGHWAYS), (rng.choice(HIGHWAYS).lower(),)),),
+            traffic_radius_mi=rng.choice([0, 5, 15]),
+            quake_radius_mi=rng.choice([50, 150, 248.5]),
+        )
+        for i in range(count)
+    }
+
+
+def wsdot_alerts(count, seed=1):
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "AlertID": i,
+            "HeadlineDescription": f"{rng.choice(HIGHWAYS)} {rng.choice(HEADLINES)} at milepost {rng.randint(1, 300)}",
+            "EventCategory": rng.choice(["Collision", "Construction", "Maintenance", "Incident"]),
+            "Priority": rng.choice(["Low", "Medium", "High", "Highest"]),
+            "StartTime": (now - timedelta(minutes=rng.randint(0, 30 * 24 * 60))).isoformat(),
+            "StartRoadwayLocation": {"Latitude": MONROE.lat + rng.uniform(-2, 2), "Longitude": MONROE.lon + rng.uniform(-2, 2)},
+        }
+        for i in range(count)
+    ]
+
+
+def usgs_features(count, seed=2):
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc).timestamp()
+    return [
+        {
+            "type": "Feature",
+            "id": f"uw{i:08d}",
+            "properties": {
+                "mag": round(rng.uniform(1.0, 5.5), 1),
+                "place": f"{rng.randint(1, 80)} km NE of Monroe, Washington",
+                "time": int((now - rng.randint(0, 86400)) * 1000),
+                "felt": rng.choice([None, 0, 3, 120]),
+                "detail": f"https://earthquake.usgs.gov/fdsnws/event/1/query?eventid=uw{i:08d}&format=geojson",
+            },
+            "geometry": {"type": "Point", "coordinates": [
+                MONROE.lon + rng.uniform(-3, 3), MONROE.lat + rng.uniform(-2, 2), rng.uniform(0, 40),
+            ]},
+        }
+        for i in range(count)
+    ]
+
+
+def usgs_detail(feature):
+    products = {"origin": [{}]}
+    if feature["properties"]["mag"] > 3:
+        products["aftershock-forecast"] = [{}]
+    return {"properties": {"products": products}}
+
+
+def nws_alerts(count, seed=3):
+    rng = random.Random(seed)
+    return [
+        {"properties": {
+            "event": rng.choice(["Wind Advisory", "Flood Watch", "Winter Storm Warning", "Tsunami Warning"]),
+            "areaDesc": f"{rng.choice(AREAS)}; {rng.choice(AREAS)}",
+            "headline": f"Alert {i} issued for the region",
+            "severity": rng.choice(["Minor", "Moderate", "Severe", "Extreme"]),
+        }}
+        for i in range(count)
+    ]
+
+
+def crime_page(count, seed=4):
+    rng = random.Random(seed)
+    markers = [
+        {"description": f"Incident report {i}", "date": f"10/{rng.randint(1, 28):02d}/2026",
+         "type": rng.choice(CRIME_TYPES), "lat": MONROE.lat, "lng": MONROE.lon}
+        for i in range(count)
+    ]
+    filler = "<div class='map-chrome'>" + "x" * 2000 + "</div>\n"
+    return f"<html><body>{filler * 20}<script>var markers = {json.dumps(markers)};</script>{filler * 20}</body></html>"
+
+
+def ntas_rss(count):
+    items = "".join(
+        f"<item><title>NTAS Bulletin {i}</title><description>Summary {i}</description>"
+        f"<pubDate>Mon, 19 Oct 2026 12:00:00 GMT</pubDate></item>"
+        for i in range(count)
+    )
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>NTAS</title>{items}</channel></rss>'.encode()
+
+
+def cap_feed(count, seed=5):
+    rng = random.Random(seed)
+    entries = "".join(
+        f"<entry><title>State alert {i}</title>"
+        f"<cap:event>{rng.choice(['Civil Emergency Message', 'Winter Weather Advisory', 'Evacuation Immediate', 'Rain'])}</cap:event>"
+        f"</entry>"
+        for i in range(count)
+    )
+    return (
+        '<?xml version="1.0"?><feed xmlns="http://www.w3.org/2005/Atom" '
+        f'xmlns:cap="urn:oasis:names:tc:emergency:cap:1.2">{entries}</feed>'
+    ).encode()
+
+
+def scraped_page(marker, size_kb=200):
+    # Outage pages are large HTML documents with the status text buried in the middle
+    filler = "<div class='nav'>" + "lorem ipsum dolor " * 50 + "</div>\n"
+    half = filler * (size_kb * 1024 // len(filler) // 2)
+    return f"<html><body>{half}<p>{marker}</p>{half}</body></html>"
+
+
+def stevens_page():
+    return scraped_page(
+        "<strong>Conditions:</strong>Bare and wet<br/>pavement</p>"
+        "<p><strong>Restrictions Eastbound:</strong>No restrictions"
+    )
+
+
+def observation():
+    return {"properties": {
+        "temperature": {"value": 11.5}, "windSpeed": {"value": 12.0}, "windDirection": {"value": 220},
+        "textDescription": "Light Rain", "precipitationLastHour": {"value": 0.8},
+    }}
+
+
+FORECAST_URL = "https://api.weather.gov/gridpoints/SEW/150,70/forecast"
+
+
+def upstream_responses(traffic_alerts=500, quakes=10, alerts=200, incidents=200, entries=50, profiles=SITES):
+    # url -> (content type, body) for every request the pollers make
+    features = usgs_features(quakes)
+    pages = {
+        traffic.ALERTS_URL: wsdot_alerts(traffic_alerts),
+        sites_query_url("2026-01-01T00:00:00Z", profiles): {"type": "FeatureCollection", "features": features},
+        FORECAST_URL: {"properties": {"periods": [{"icon": "https://api.weather.gov/icons/land/day/rain?size=medium"}]}},
+        weather.ALERTS_URL: {"features": nws_alerts(alerts)},
+        weather.STEVENS_PASS_URL: stevens_page(),
+        hazard.PUD_URL: scraped_page("Current outages: 37 customers"),
+        hazard.PSE_URL: scraped_page("Natural gas: no outages"),
+        hazard.XFINITY_URL: scraped_page("User reports indicate no problems at Comcast"),
+        geopolitical.NTAS_RSS: ntas_rss(entries),
+        geopolitical.NWS_CAP: cap_feed(entries),
+    }
+    for feature in features:
+        pages[feature["properties"]["detail"]] = usgs_detail(feature)
+    for site in profiles.values():
+        pages[weather.observation_url(site)] = observation()
+        pages[weather.points_url(site)] = {"properties": {"forecast": FORECAST_URL}}
+        pages[crime.crime_url(site)] = crime_page(incidents)
+
+    responses = {}
+    for url, body in pages.items():
+        if isinstance(body, (dict, list)):
+            responses[url] = ("application/json", json.dumps(body).encode())
+        elif isinstance(body, str):
+            responses[url] = ("text/html; charset=utf-8", body.encode())
+        else:
+            responses[url] = ("application/xml", body)
+    return responses
+
+
+def write_archive(path, **sizes):
+    # Replay archive (see app.replay) that stands in for every upstream during the load test
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for url, (content_type, body) in upstream_responses(**sizes).items():
+            f.write(json.dumps({
+                "key": request_key("GET", url),
+                "url": url,
+                "elapsed": 0.0,
+                "status": 200,
+                "headers": [["content-type", content_type]],
+                "body": base64.b64encode(body).decode(),
+            }) + "\n")
+    return path
+
+
+def frame_pair(width, height, moving=True, seed=6):
+    # Two noisy frames of the same scene; with moving=True a few objects shift between them
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    scene = rng.integers(60, 120, size=(height, width, 3), dtype=np.uint8)
+    frame1 = scene.copy()
+    frame2 = scene.copy()
+    frame2 = np.clip(frame2.astype(np.int16) + rng.integers(-4, 5, size=frame2.shape), 0, 255).astype(np.uint8)
+    if moving:
+        size = max(height // 12, 8)
+        for i in range(5):
+            x = (i + 1) * width // 7
+            y = height // 3 + (i % 2) * height // 4
+            frame1[y:y + size, x:x + size] = 230
+            frame2[y + size // 2:y + size + size // 2, x + size // 2:x + size + size // 2] = 230
+    return frame1, frame2
+
+
+def write_frames(directory, width=640, height=480, count=4, moving=False):
+    import cv2
+    os.makedirs(directory, exist_ok=True)
+    frame1, frame2 = frame_pair(width, height, moving=moving)
+    for i in range(count):
+        cv2.imwrite(os.path.join(directory, f"frame{i:03d}.jpg"), frame1 if i % 2 == 0 else frame2)
+    return directory
@@ -0,0 +1,35 @@
+import asyncio
+from app import cluster
+from app.shared import MemoryBackend
+from app.state import StateStore
+
+
+def test_one_leader_per_backend_and_follower_serves_its_values(monkeypatch):
+    started = []
+    monkeypatch.setattr(cluster, "start_pollers", lambda: started.append(1) or [])
+    monkeypatch.setattr(cluster, "run_history_writer", asyncio.Event().wait)
+    monkeypatch.setattr(cluster, "_decay_ticker", asyncio.Event().wait)
+    monkeypatch.setattr(cluster, "run_snapshot_writer", lambda state: asyncio.Event().wait())
+    monkeypatch.setattr(cluster, "save_snapshot", lambda state: None)
+    monkeypatch.setattr(cluster, "engines", {})
+    monkeypatch.setattr(cluster, "SYNC_INTERVAL", 0.01)
+
+    async def run():
+        backend = MemoryBackend()
+        first = cluster.Coordinator(backend, state=StateStore(), node_id="a")
+        second = cluster.Coordinator(backend, state=StateStore(), node_id="b")
+        await first.start()
+        await second.start()
+        try:
+            assert [c.leader for c in (first, second)] == [True, False]
+            assert started == [1]
+            assert first._leader_tasks and not second._leader_tasks
+
+            first.state.set("weather", {"current_temp": 51})
+            await asyncio.sleep(0.05)
+            assert second.state.get("weather") == {"current_temp": 51}
+        finally:
+            await second.stop()
+            await first.stop()
+
+    asyncio.run(run())